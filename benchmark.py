@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+
+from conversation_parser import EXPORT_DIR, INDEX_CSV, LOG_PATH, MANIFEST_PATH
+from conversation_store import STORE_DB
+from index_snapshot import SNAPSHOT_PATH
+from search_index import SEARCH_DB
+from tag_store import TAG_JOURNAL
+
+RESULTS_PATH = "bench_results.json"
+EXPORT_NAME = "conversations.json"
+
+# Files a cold import starts without
+IMPORT_OUTPUTS = [
+    EXPORT_DIR, INDEX_CSV, MANIFEST_PATH, TAG_JOURNAL, SNAPSHOT_PATH, LOG_PATH,
+    *(db + suffix for db in (SEARCH_DB, STORE_DB) for suffix in ("", "-wal", "-shm")),
+]
+
+WORDS = (
+    "python code file data export parser viewer index search sqlite memory stream chunk "
+    "tag query render widget thread import markdown conversation message model filter "
+    "horror movie garden guitar recipe travel budget invoice schedule design network"
+).split()
+TOPICS = ["python", "sqlite", "horror", "garden", "guitar", "travel", "budget", "design"]
+
+
+def generate_export(path, conversations=1000, depth=8, part_chars=400, non_string_fraction=0.05, seed=1):
+    """Write a synthetic conversations.json shaped like an OpenAI export.
+
+    Each conversation is a single thread of depth messages whose text parts are
+    about part_chars long; non_string_fraction of parts are image-style dicts.
+    Written one conversation at a time, so any size can be generated.
+    """
+    rng = random.Random(seed)
+    start = 1700000000
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i in range(conversations):
+            topic = TOPICS[i % len(TOPICS)]
+            mapping = {"root": {"id": "root", "message": None, "parent": None, "children": []}}
+            parent = "root"
+            for j in range(depth):
+                node_id = f"n{i}_{j}"
+                if rng.random() < non_string_fraction:
+                    part = {"content_type": "image_asset_pointer", "asset_pointer": f"file-service://file-{i}-{j}",
+                            "size_bytes": rng.randint(1000, 900000), "width": 1024, "height": 768}
+                else:
+                    words = []
+                    size = 0
+                    while size < part_chars:
+                        word = topic if rng.random() < 0.05 else rng.choice(WORDS)
+                        words.append(word)
+                        size += len(word) + 1
+                    part = " ".join(words)
+                mapping[node_id] = {
+                    "id": node_id,
+                    "message": {
+                        "author": {"role": "user" if j % 2 == 0 else "assistant"},
+                        "create_time": start + i * 3600 + j,
+                        "content": {"content_type": "text", "parts": [part]},
+                    },
+                    "parent": parent,
+                    "children": [],
+                }
+                mapping[parent]["children"].append(node_id)
+                parent = node_id
+            convo = {
+                "id": f"conv-{i}",
+                "title": f"Synthetic {i} {topic}",
+                "create_time": start + i * 3600,
+                "update_time": start + i * 3600 + depth,
+                "mapping": mapping,
+                "current_node": parent,
+            }
+            if i:
+                f.write(",")
+            f.write(json.dumps(convo))
+        f.write("]")
+
+
+def measure(fn, setup=None, repeat=1, memory=True):
+    """Best-of-repeat wall time for fn(), plus its peak traced Python memory.
+
+    Memory is taken in one extra run under tracemalloc so tracing doesn't skew
+    the timings. It only covers this process (not --jobs worker processes).
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t)
+    result = {"seconds": min(runs), "runs": runs}
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_mb"] = peak / 1e6
+    return result
+
+
+def clean_outputs():
+    for name in IMPORT_OUTPUTS:
+        if os.path.isdir(name):
+            shutil.rmtree(name)
+        elif os.path.exists(name):
+            os.remove(name)
+
+
+def bench_parser(args, export_path, results):
+    import conversation_parser
+    from conversation_parser import extract_messages, iter_conversations, open_export
+    import tag_extractor
+
+    argv = [export_path, "--jobs", str(args.jobs), "--store", args.store]
+    results["parser_cold_import"] = measure(lambda: conversation_parser.main(argv), setup=clean_outputs,
+                                            repeat=args.repeat, memory=args.memory)
+    results["parser_reimport"] = measure(lambda: conversation_parser.main(argv),
+                                         repeat=args.repeat, memory=args.memory)
+
+    def load():
+        with open_export(export_path) as (f, _):
+            return list(iter_conversations(f))
+    conversations = load()
+    results["extract_messages"] = measure(lambda: [extract_messages(c) for c in conversations],
+                                          repeat=args.repeat, memory=args.memory)
+    messages = [extract_messages(c) for c in conversations]
+    results["extract_tags"] = measure(lambda: [tag_extractor.extract_tags(m) for m in messages],
+                                      repeat=args.repeat, memory=args.memory)
+
+
+def _wait_for(app, condition, timeout=30.0):
+    # Spin a local event loop until condition() holds, so worker-pool signals arrive
+    from PySide6.QtCore import QEventLoop, QTimer
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec()
+
+
+def bench_viewer(args, results):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6.QtCore import QThreadPool
+        from PySide6.QtWidgets import QApplication
+    except ImportError:
+        print("PySide6 not installed; skipping viewer benchmarks")
+        return
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    import main_viewer
+    from search_engine import iter_match_positions, lookup_content_hits, read_markdown_file
+    from search_index import SearchIndex
+
+    viewers = []
+
+    def start_viewer():
+        viewer = main_viewer.FeralCatViewer()
+        viewers.append(viewer)
+        return viewer
+
+    def settle():
+        QThreadPool.globalInstance().waitForDone()
+        _wait_for(app, lambda: True, 0)
+
+    results["viewer_startup_cold"] = measure(
+        start_viewer, setup=lambda: os.path.exists(SNAPSHOT_PATH) and os.remove(SNAPSHOT_PATH),
+        repeat=args.repeat, memory=args.memory)
+    settle()
+    results["viewer_startup"] = measure(start_viewer, repeat=args.repeat, memory=args.memory)
+    settle()
+
+    viewer = viewers[-1]
+    _wait_for(app, lambda: viewer.sidebar_model.rowCount() == len(viewer.index))
+    tag_counts = viewer.filter_index.tag_counts()
+    tags = sorted(tag_counts, key=tag_counts.get, reverse=True)[:5]
+    dates = sorted(row["date"] for row in viewer.index)
+    date_range = (dates[len(dates) // 4], dates[3 * len(dates) // 4]) if dates else (None, None)
+
+    def filter_queries():
+        for _ in range(20):
+            viewer.filter_index.candidates((), date_range)
+            for tag in tags:
+                viewer.filter_index.candidates([tag], date_range)
+    results["viewer_filter"] = measure(filter_queries, repeat=args.repeat, memory=args.memory)
+    results["viewer_filter"]["queries"] = 20 * (len(tags) + 1)
+
+    queries = ["python", "sqlite index", "garden tom", "zzzz"]
+    search_index = SearchIndex.open_existing()
+    store = viewer.store
+
+    def search_queries():
+        # The same steps _SearchTask runs for each query, without the thread hop
+        for query in queries:
+            hits = lookup_content_hits(query, search_index, store)
+            list(iter_match_positions(viewer.index, query, content_hits=hits,
+                                      read_content=lambda r: read_markdown_file(r["filename"])))
+    results["viewer_search"] = measure(search_queries, repeat=args.repeat, memory=args.memory)
+    results["viewer_search"]["queries"] = len(queries)
+    if search_index:
+        search_index.close()
+
+    count = min(args.render_count, viewer.sidebar_model.rowCount())
+    prefetch = main_viewer.PREFETCH_NEIGHBORS
+    main_viewer.PREFETCH_NEIGHBORS = 0  # Time the render path itself, not background prefetch
+
+    def render():
+        for i in range(count):
+            viewer.render_cache.clear()
+            viewer.load_selected_convo(viewer.sidebar_model.index(i), None)
+    try:
+        results["viewer_render"] = measure(render, repeat=args.repeat, memory=args.memory)
+        results["viewer_render"]["conversations"] = count
+    finally:
+        main_viewer.PREFETCH_NEIGHBORS = prefetch
+    settle()
+    for v in viewers:
+        v.close()
+        v.deleteLater()
+    settle()
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\nCompared with {baseline_path}:")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old and old.get("seconds"):
+            ratio = result["seconds"] / old["seconds"]
+            print(f"  {name:24} {old['seconds']:9.3f}s -> {result['seconds']:9.3f}s  ({ratio:5.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the parser and viewer on a synthetic export.")
+    parser.add_argument("--conversations", type=int, default=1000, help="conversations to generate (default: 1000)")
+    parser.add_argument("--depth", type=int, default=8, help="messages per conversation (default: 8)")
+    parser.add_argument("--part-chars", type=int, default=400, help="characters per text part (default: 400)")
+    parser.add_argument("--non-string-fraction", type=float, default=0.05,
+                        help="share of parts that are image-style dicts (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--jobs", type=int, default=1, help="parser worker processes (default: 1)")
+    parser.add_argument("--store", choices=["markdown", "sqlite"], default="markdown")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per case; the best is kept (default: 1)")
+    parser.add_argument("--render-count", type=int, default=20, help="conversations to render (default: 20)")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc runs")
+    parser.add_argument("--no-viewer", dest="viewer", action="store_false", help="skip the Qt viewer cases")
+    parser.add_argument("--workdir", help="new or empty directory to generate and import in, kept afterwards "
+                                          "(default: a temporary directory)")
+    parser.add_argument("--output", default=RESULTS_PATH, help=f"JSON results file (default: {RESULTS_PATH})")
+    parser.add_argument("--compare", metavar="RESULTS", help="earlier results file to compare timings against")
+    args = parser.parse_args(argv)
+    # Each case deletes the index, exports and store it finds, so never run inside a real library
+    if args.workdir and os.path.isdir(args.workdir) and os.listdir(args.workdir):
+        parser.error(f"--workdir {args.workdir} is not empty; the benchmark deletes index files in it")
+
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    workdir = args.workdir or tempfile.mkdtemp(prefix="feralcat_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)  # The parser and viewer work relative to the current directory
+    results = {}
+    try:
+        export_path = os.path.join(workdir, EXPORT_NAME)
+        t = time.perf_counter()
+        generate_export(export_path, args.conversations, args.depth, args.part_chars,
+                        args.non_string_fraction, args.seed)
+        print(f"Generated {args.conversations} conversations ({os.path.getsize(export_path) / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - t:.1f}s")
+        bench_parser(args, export_path, results)
+        if args.viewer:
+            bench_viewer(args, results)
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, result in results.items():
+        peak = f"{result['peak_mb']:8.1f} MB peak" if "peak_mb" in result else ""
+        print(f"  {name:24} {result['seconds']:9.3f}s {peak}")
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "workdir")}
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+        },
+        "results": results,
+    }
+    try:
+        import resource
+        # Whole-process high-water mark (KB on Linux, bytes on macOS)
+        report["meta"]["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        pass
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
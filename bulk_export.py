@@ -0,0 +1,86 @@
+import json
+import os
+import zipfile
+
+EXPORT_FORMATS = {
+    "md": "Markdown (*.md)",
+    "jsonl": "JSON Lines (*.jsonl)",
+    "zip": "Zip of Markdown files (*.zip)",
+}
+
+# Above this many characters the clipboard path gives up and suggests an export
+CLIPBOARD_LIMIT = 8 * 1024 * 1024
+
+SECTION_SEPARATOR = "\n\n---\n\n"
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def format_section(row, content):
+    return f"## {row['date']} - {row['title']}\n\n{content}"
+
+
+def collect_for_clipboard(rows, read_content, limit=CLIPBOARD_LIMIT):
+    """Join the rows' content for the clipboard.
+
+    Returns (text, count); text is None once the total would pass limit, so a
+    broad selection stops reading early instead of building a huge string.
+    """
+    sections = []
+    size = 0
+    for row in rows:
+        content = read_content(row)
+        if content is None:
+            continue
+        section = format_section(row, content)
+        size += len(section) + len(SECTION_SEPARATOR)
+        if size > limit:
+            return None, len(sections)
+        sections.append(section)
+    return SECTION_SEPARATOR.join(sections), len(sections)
+
+
+def export_conversations(rows, dest_path, fmt, read_content, progress=None, should_stop=None):
+    """Stream rows' content to dest_path as one Markdown file, JSON lines or a zip.
+
+    Only one conversation is held in memory at a time. Output goes to a
+    temporary file that replaces dest_path when complete, so a cancelled or
+    failed export leaves nothing behind. progress(done, total) is called after
+    each row; raises ExportCancelled if should_stop() returns True. Returns the
+    number of conversations written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    tmp_path = dest_path + ".tmp"
+    written = 0
+    try:
+        if fmt == "zip":
+            out = zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            out = open(tmp_path, "w", encoding="utf-8")
+        with out:
+            for done, row in enumerate(rows, 1):
+                if should_stop and should_stop():
+                    raise ExportCancelled("Export cancelled")
+                content = read_content(row)
+                if content is not None:
+                    if fmt == "zip":
+                        out.writestr(row['filename'], content)
+                    elif fmt == "jsonl":
+                        record = {"filename": row['filename'], "date": row['date'],
+                                  "title": row['title'], "content": content}
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    else:
+                        if written:
+                            out.write(SECTION_SEPARATOR)
+                        out.write(format_section(row, content))
+                    written += 1
+                if progress:
+                    progress(done, len(rows))
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return written
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+from conversation_store import ConversationStore
+from index_snapshot import load_index
+from search_engine import read_markdown_file, search_positions
+from search_index import SearchIndex
+from tag_store import TagStore
+
+# Stand-ins for an open end of --from/--to; the date filter needs both ends
+MIN_DATE = "0001-01-01"
+MAX_DATE = "9999-12-31"
+
+
+def _date_arg(value):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {value!r}")
+
+
+def _limit_arg(value):
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise argparse.ArgumentTypeError(f"not a positive whole number: {value!r}")
+    return limit
+
+
+def iter_search(query="", tags=(), date_from=None, date_to=None, ranked=False, limit=None, content=False):
+    """Yield one dict per matching conversation, filtered and ordered as in the viewer.
+
+    Works on the index in the current directory: the SQLite store if the
+    parser created one, otherwise the Markdown index. Yields nothing if there
+    is no index yet.
+    """
+    store = ConversationStore.open_existing()
+    search_index = None
+    try:
+        rows, filter_index, _ = load_index(store, None if store else TagStore())
+        if rows is None:
+            return
+        date_range = (date_from or MIN_DATE, date_to or MAX_DATE) if (date_from or date_to) else (None, None)
+        positions = filter_index.candidates({t.lstrip("#") for t in tags}, date_range)
+        query = query.strip().lower()
+        if query:
+            search_index = SearchIndex.open_existing()
+        for pos, score in search_positions(rows, query, positions, search_index, store, ranked=ranked, limit=limit):
+            row = rows[pos]
+            record = {
+                "filename": row['filename'],
+                "date": row['date'],
+                "title": row['title'],
+                "word_count": int(row['word_count']) if str(row['word_count']).isdigit() else row['word_count'],
+                "tags": list(filter_index.row_tags(pos)),
+            }
+            if score is not None:
+                record["score"] = round(score, 6)
+            if content:
+                record["content"] = (store.read_markdown(row['filename']) if store
+                                      else read_markdown_file(row['filename']))
+            yield record
+    finally:
+        if search_index:
+            search_index.close()
+        if store:
+            store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the conversation index without the viewer.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="print matching conversations as JSON lines")
+    search.add_argument("query", nargs="?", default="", help="words to search for (titles and content)")
+    search.add_argument("--tag", action="append", default=[], help="only conversations with this tag (repeatable)")
+    search.add_argument("--from", dest="date_from", type=_date_arg, metavar="DATE",
+                        help="only conversations on or after DATE (YYYY-MM-DD)")
+    search.add_argument("--to", dest="date_to", type=_date_arg, metavar="DATE",
+                        help="only conversations on or before DATE (YYYY-MM-DD)")
+    search.add_argument("--rank", action="store_true", help='best BM25 matches first; "quoted phrases" must match')
+    search.add_argument("--limit", type=_limit_arg, help="stop after this many results (at least 1)")
+    search.add_argument("--content", action="store_true", help="include each conversation's Markdown text")
+    args = parser.parse_args(argv)
+
+    try:
+        for record in iter_search(args.query, args.tag, args.date_from, args.date_to,
+                                  ranked=args.rank, limit=args.limit, content=args.content):
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # Flush per record so a reader piped to us sees each match as soon as it is found
+            sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+if __name__ == "__main__":
+    main()
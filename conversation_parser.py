@@ -1,42 +1,197 @@
 import os
-import sys
+import io
 import json
 import csv
 import hashlib
+import argparse
+import time
+import zipfile
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
+
+from conversation_store import ConversationStore, STORE_DB
+from search_index import SearchIndex, SEARCH_DB, build_postings, tokenize
+from near_duplicates import signature as minhash_signature
+from tag_store import TAG_RE, TagStore, TAG_JOURNAL, title_with_tags
+import metrics
 
 EXPORT_DIR = "markdown_exports"
 INDEX_CSV = "feralcat_index.csv"
 LOG_PATH = "feralcat_log.txt"
+MANIFEST_PATH = "feralcat_manifest.json"
+# Name of the conversations file inside an OpenAI export archive
+EXPORT_MEMBER = "conversations.json"
+# Characters read per refill when streaming the export
+STREAM_CHUNK_SIZE = 1 << 20
+# Conversations handed to the worker pool per batch, per job (bounds memory with --jobs)
+BATCH_PER_JOB = 32
+# Conversations written per SQLite transaction with --store sqlite
+STORE_BATCH = 500
+# Minimum seconds between run_import progress callbacks
+PROGRESS_INTERVAL = 0.1
 
 def log(message):
     timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
     with open(LOG_PATH, "a", encoding="utf-8") as f:
         f.write(f"{timestamp} {message}\n")
 
-def extract_messages(convo):
-    messages = []
-    for node in convo.get("mapping", {}).values():
-        if not isinstance(node, dict):
+@contextmanager
+def open_export(path):
+    # (text stream, size in bytes) for conversations.json, read either from the file
+    # itself or straight out of an OpenAI export .zip (no extracted copy is written).
+    # The stream's .buffer.tell() reports how many bytes have been consumed.
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            members = [n for n in zf.namelist() if n.rsplit("/", 1)[-1] == EXPORT_MEMBER]
+            if not members:
+                raise FileNotFoundError(f"No {EXPORT_MEMBER} found in {os.path.basename(path)}")
+            # Prefer the shallowest match if the archive nests a folder
+            member = min(members, key=lambda n: n.count("/"))
+            with zf.open(member) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8"), zf.getinfo(member).file_size
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            yield f, os.path.getsize(path)
+
+def iter_conversations(f, chunk_size=STREAM_CHUNK_SIZE):
+    # Yield conversations one at a time from the top-level JSON array without
+    # loading the whole export, so memory stays bounded by the largest conversation.
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+
+    def refill(size=chunk_size):
+        nonlocal buf, pos, eof
+        chunk = f.read(size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    while True:
+        # Skip whitespace and array punctuation between items
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or not refill():
+                break
+        if pos >= len(buf):
+            if not started:
+                raise ValueError("Empty export: expected a JSON array of conversations")
+            raise ValueError("Unexpected end of export: missing closing ']'")
+        ch = buf[pos]
+        if not started:
+            if ch != "[":
+                raise ValueError("Expected the export to be a JSON array of conversations")
+            started = True
+            pos += 1
+            continue
+        if ch == "]":
+            return
+        grow = chunk_size
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                # Most likely the item straddles the buffer edge; read more and retry.
+                # Grow the read geometrically so huge conversations stay linear.
+                if eof or not refill(grow):
+                    raise
+                grow *= 2
+        pos = end
+        yield item
+
+# One message in transcript order
+MessageRecord = namedtuple("MessageRecord", ["role", "timestamp", "parts"])
+
+def _message_parts(message):
+    content_block = message.get("content")
+    if isinstance(content_block, dict):
+        parts = content_block.get("parts", [])
+        if isinstance(parts, list):
+            return parts
+        elif isinstance(parts, str):
+            return [parts]
+    elif isinstance(content_block, str):
+        return [content_block]
+    return []
+
+def _node_order(mapping, current_node, include_branches):
+    # Node ids in transcript order. Both walks are iterative and visit each node
+    # at most once, so very deep threads cannot hit the recursion limit.
+    if not include_branches and current_node in mapping:
+        path = []
+        seen = set()
+        node_id = current_node
+        while node_id in mapping and node_id not in seen:
+            seen.add(node_id)
+            path.append(node_id)
+            node = mapping[node_id]
+            node_id = node.get("parent") if isinstance(node, dict) else None
+        path.reverse()
+        return path
+
+    # Whole tree (or no usable current_node): pre-order walk from every root,
+    # children in the order the export lists them.
+    roots = [
+        node_id for node_id, node in mapping.items()
+        if isinstance(node, dict) and node.get("parent") not in mapping
+    ]
+    order = []
+    seen = set()
+    stack = list(reversed(roots))
+    while stack:
+        node_id = stack.pop()
+        if node_id in seen or node_id not in mapping:
             continue
-        message = node.get("message")
+        seen.add(node_id)
+        order.append(node_id)
+        node = mapping[node_id]
+        if isinstance(node, dict):
+            stack.extend(reversed(node.get("children") or []))
+    return order
+
+def walk_message_tree(convo, include_branches=False):
+    # Ordered MessageRecords following the conversation tree. By default only the
+    # branch ending at current_node is kept; regenerated/abandoned branches are dropped.
+    mapping = convo.get("mapping") or {}
+    if not isinstance(mapping, dict):
+        return []
+    records = []
+    for node_id in _node_order(mapping, convo.get("current_node"), include_branches):
+        node = mapping[node_id]
+        message = node.get("message") if isinstance(node, dict) else None
         if not message:
             continue
-        content_block = message.get("content")
-        if isinstance(content_block, dict):
-            parts = content_block.get("parts", [])
-            if isinstance(parts, list):
-                messages.extend(parts)
-            elif isinstance(parts, str):
-                messages.append(parts)
-        elif isinstance(content_block, str):
-            messages.append(content_block)
+        author = message.get("author") or {}
+        records.append(MessageRecord(
+            author.get("role", "unknown") if isinstance(author, dict) else "unknown",
+            message.get("create_time"),
+            _message_parts(message),
+        ))
+    return records
+
+def extract_messages(convo, include_branches=False):
+    messages = []
+    for record in walk_message_tree(convo, include_branches):
+        messages.extend(record.parts)
     return messages
 
 def safe_filename(s):
     return "".join(c for c in s if c not in r'\/:*?"<>|').strip()
 
-def load_existing_tags():
+def load_existing_tags(journal, manifest):
+    # Conversation id -> tags, through the manifest's record of each id's file. Index
+    # rows no manifest entry claims (a library from before the manifest) stay keyed
+    # by filename.
     tags_by_filename = {}
     if os.path.exists(INDEX_CSV):
         with open(INDEX_CSV, "r", encoding="utf-8") as f:
@@ -46,7 +201,16 @@ def load_existing_tags():
                 filename = row["filename"]
                 tags = [word for word in title.split() if word.startswith("#")]
                 tags_by_filename[filename] = tags
-    return tags_by_filename
+    # Tag edits made in the viewer are journaled rather than written to the CSV
+    for filename, tags in journal.tags.items():
+        tags_by_filename[filename] = [f"#{t}" for t in tags]
+    existing_tags = {}
+    for convo_id, entry in manifest.items():
+        tags = tags_by_filename.pop(entry.get("filename"), None)
+        if tags is not None:
+            existing_tags[convo_id] = tags
+    existing_tags.update(tags_by_filename)
+    return existing_tags
 
 def file_hash(path):
     if not os.path.exists(path):
@@ -58,102 +222,459 @@ def compute_message_hash(messages):
     clean = [m if isinstance(m, str) else json.dumps(m, sort_keys=True) for m in messages]
     return hashlib.sha1("".join(clean).encode("utf-8")).hexdigest()
 
-def main():
-    if len(sys.argv) < 2:
-        print("❌ No input file provided. Usage: python conversation_parser.py <path_to_conversations.json>")
-        log("❌ Parser run failed — No input file provided.")
+def conversation_id(convo):
+    return convo.get("id") or convo.get("conversation_id")
+
+def load_manifest():
+    # conversation id -> {msg_hash, update_time, title, filename, mtime, size, word_count}
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        log("⚠️ Import manifest unreadable — falling back to full comparison.")
+        return {}
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def _file_matches(filepath, entry):
+    # Cheap stat check that the file on disk is still the one we wrote
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return False
+    return st.st_mtime == entry.get("mtime") and st.st_size == entry.get("size")
+
+def conversation_filename(convo):
+    # "<date> - <title>.md", before unique_filenames separates conversations sharing one
+    return f"{conversation_date(convo)} - {safe_filename(conversation_title(convo))}.md"
+
+def conversation_title(convo):
+    return convo.get("title", "Untitled Conversation").strip()
+
+def conversation_date(convo):
+    date_str = convo.get("create_time")
+    if not date_str:
+        return "unknown"
+    try:
+        if isinstance(date_str, (int, float)):
+            dt = datetime.fromtimestamp(date_str)
+        else:
+            dt = datetime.fromisoformat(date_str)
+        return dt.strftime("%Y-%m-%d")
+    except Exception:
+        return "unknown"
+
+def unique_filenames(conversations, manifest):
+    # Pair each conversation with a filename no other conversation in the export uses.
+    # Same-day conversations with the same title (e.g. "New chat") get a short id
+    # suffix; a conversation keeps the name it was given last time wherever it can.
+    claimed = {entry.get("filename"): convo_id for convo_id, entry in manifest.items()}
+    taken = set()
+    for n, convo in enumerate(conversations):
+        convo_id = conversation_id(convo)
+        base = conversation_filename(convo)
+        suffixed = f"{base[:-3]} ({(convo_id or str(n))[:8]}).md"
+        previous = (manifest.get(convo_id) or {}).get("filename")
+        if previous in (base, suffixed) and previous not in taken:
+            filename = previous
+        elif base not in taken and claimed.get(base, convo_id) == convo_id:
+            filename = base
+        else:
+            filename = suffixed
+            if filename in taken:
+                filename = f"{base[:-3]} ({convo_id or n}).md"
+        taken.add(filename)
+        yield convo, filename
+
+def process_conversation(convo, filename, existing_tags, manifest_entry=None, include_branches=False,
+                         write_markdown=True, reindex=False):
+    # Everything done for a single conversation; safe to run in a worker process.
+    # With write_markdown=False nothing is written; changed message bodies are
+    # returned in result["messages"] for the SQLite store instead. Whenever the
+    # text is extracted, its search postings come back in result["postings"].
+    title = conversation_title(convo)
+    date = conversation_date(convo)
+    filepath = os.path.join(EXPORT_DIR, filename)
+
+    # Tags are looked up by conversation id, so conversations sharing a title keep their own
+    convo_id = conversation_id(convo)
+    tags_key = convo_id if convo_id in existing_tags else filename
+    old_tags = set(existing_tags.get(tags_key, []))
+    title_wo_tags = " ".join(part for part in title.split() if not part.startswith("#"))
+    final_tags = sorted(old_tags)
+    final_title = f"{title_wo_tags} {' '.join(final_tags)}".strip()
+    update_time = convo.get("update_time")
+
+    row = {
+        "title": final_title,
+        "date": date,
+        "filename": filename,
+        "word_count": 0
+    }
+    result = {
+        "id": convo_id,
+        "row": row,
+        "status": "unchanged",
+        "preserved": None,
+        "merged": None,
+        "manifest": manifest_entry,
+    }
+
+    # Fast path: same export timestamp, same title/tags and our file untouched on disk
+    entry = manifest_entry
+    if (entry and not reindex and update_time is not None and entry.get("update_time") == update_time
+            and entry.get("filename") == filename and entry.get("title") == final_title
+            and entry.get("branches", False) == include_branches
+            and (not write_markdown or _file_matches(filepath, entry))):
+        row["word_count"] = entry.get("word_count", 0)
+        return result
+
+    t0 = time.perf_counter()
+    records = walk_message_tree(convo, include_branches)
+    messages = [part for record in records for part in record.parts]
+    clean_messages = [m if isinstance(m, str) else json.dumps(m, sort_keys=True) for m in messages]
+    t1 = time.perf_counter()
+    new_msg_hash = compute_message_hash(messages)
+    t2 = time.perf_counter()
+
+    new_md_content = f"# {final_title}\n\n" + "\n\n".join(clean_messages)
+    row["word_count"] = len(new_md_content.split())
+    tokens = tokenize(new_md_content.strip())
+    non_text = [clean for m, clean in zip(messages, clean_messages) if not isinstance(m, str)]
+    if non_text:
+        # Words from image pointers and other JSON parts; auto-tagging discounts them
+        result["non_text_counts"] = dict(Counter(t for part in non_text for t in tokenize(part)))
+    # The "# title" line comes first, so its tokens are the document's leading positions
+    title_length = len(tokenize(final_title))
+    postings, length = build_postings(tokens)
+    t3 = time.perf_counter()
+    try:
+        # Near-duplicates are judged on the messages alone, so a retitled copy still matches
+        signature = minhash_signature(tokens[title_length:])
+    except ImportError:
+        signature = None
+    result["postings"] = (postings, length, title_length, signature)
+    # Seconds per phase; run_import sums them into the metrics log (workers don't write it)
+    result["timings"] = {"extract": t1 - t0, "hash": t2 - t1, "tokenize": t3 - t2, "minhash": time.perf_counter() - t3}
+
+    should_write = True
+    if not write_markdown:
+        if not entry:
+            result["status"] = "new"
+        elif entry.get("msg_hash") != new_msg_hash:
+            result["status"] = "updated"
+        elif entry.get("title") != final_title and final_tags:
+            result["preserved"] = f"    - {filename} → {' '.join(final_tags)}"
+        if result["status"] != "unchanged" or entry.get("branches", False) != include_branches:
+            result["messages"] = [
+                (record.role, record.timestamp,
+                 "\n\n".join(p if isinstance(p, str) else json.dumps(p, sort_keys=True) for p in record.parts))
+                for record in records if record.parts
+            ]
+        should_write = False
+    elif not os.path.exists(filepath):
+        result["status"] = "new"
+    elif entry and entry.get("filename") == filename:
+        if entry.get("msg_hash") != new_msg_hash:
+            result["status"] = "updated"
+        elif entry.get("title") != final_title or not _file_matches(filepath, entry):
+            if final_tags:
+                result["preserved"] = f"    - {filename} → {' '.join(final_tags)}"
+        else:
+            should_write = False
+    else:
+        # No manifest record yet (first run after upgrading): compare file contents once
+        new_file_hash = hashlib.sha1(new_md_content.strip().encode("utf-8")).hexdigest()
+        if new_file_hash == file_hash(filepath):
+            should_write = False
+        elif final_tags:
+            result["preserved"] = f"    - {filename} → {' '.join(final_tags)}"
+
+    if tags_key in existing_tags:
+        old_in_title = set(existing_tags[tags_key])
+        new_in_title = set(final_tags)
+        newly_added = new_in_title - old_in_title
+        if newly_added:
+            result["merged"] = f"    - {filename} → added: {' '.join(sorted(newly_added))}"
+
+    if should_write:
+        t = time.perf_counter()
+        with open(filepath, "w", encoding="utf-8") as md_file:
+            md_file.write(new_md_content.strip())
+        result["timings"]["write"] = time.perf_counter() - t
+
+    result["manifest"] = {
+        "msg_hash": new_msg_hash,
+        "update_time": update_time,
+        "title": final_title,
+        "filename": filename,
+        "word_count": row["word_count"],
+        "branches": include_branches,
+    }
+    if write_markdown:
+        st = os.stat(filepath)
+        result["manifest"]["mtime"] = st.st_mtime
+        result["manifest"]["size"] = st.st_size
+    return result
+
+# Worker-process state, set once per worker by the pool initializer
+_worker_tags = None
+_worker_options = {}
+
+def _init_worker(existing_tags, options):
+    global _worker_tags, _worker_options
+    _worker_tags = existing_tags
+    _worker_options = options
+
+def _process_in_worker(task):
+    convo, filename, manifest_entry = task
+    return process_conversation(convo, filename, _worker_tags, manifest_entry, **_worker_options)
+
+def iter_results(conversations, existing_tags, jobs=1, manifest=None, include_branches=False, write_markdown=True,
+                 reindex=False):
+    # Yield process_conversation results in input order. With jobs > 1 the work is
+    # fanned out to a process pool one bounded batch at a time.
+    manifest = manifest or {}
+    options = {"include_branches": include_branches, "write_markdown": write_markdown, "reindex": reindex}
+    named = unique_filenames(conversations, manifest)
+    if jobs <= 1:
+        for convo, filename in named:
+            yield process_conversation(convo, filename, existing_tags, manifest.get(conversation_id(convo)), **options)
         return
 
-    json_path = sys.argv[1]
+    batch_size = jobs * BATCH_PER_JOB
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(existing_tags, options)) as pool:
+        while True:
+            batch = [(convo, filename, manifest.get(conversation_id(convo)))
+                     for convo, filename in islice(named, batch_size)]
+            if not batch:
+                break
+            # map() preserves order, so index rows and logs stay deterministic
+            yield from pool.map(_process_in_worker, batch, chunksize=max(1, len(batch) // (jobs * 4)))
 
-    if not os.path.exists(EXPORT_DIR):
-        os.makedirs(EXPORT_DIR)
+class ImportCancelled(Exception):
+    pass
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def _timed_iter(iterable, timings, key):
+    # Yield from iterable, adding the time spent producing items to timings[key]
+    it = iter(iterable)
+    while True:
+        t = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        finally:
+            timings[key] = timings.get(key, 0.0) + time.perf_counter() - t
+        yield item
 
-    existing_tags = load_existing_tags()
+def _auto_tag(search_index, rows, non_text_counts=None, should_stop=None):
+    # Swap last import's TF-IDF tags on new/changed rows ({filename: row}) for fresh ones; returns the retitled rows
+    from tag_extractor import rank_tags
+
+    n_docs = search_index.doc_count()
+    filenames = list(rows)
+    previous = search_index.auto_tags(filenames)
+    non_text_counts = non_text_counts or {}
+    tagged = []
+    for i in range(0, len(filenames), STORE_BATCH):
+        if should_stop and should_stop():
+            raise ImportCancelled("Import cancelled while tagging")
+        chunk = filenames[i:i + STORE_BATCH]
+        counts = search_index.term_counts(chunk)
+        docs = [_text_counts(counts.get(filename, {}), non_text_counts.get(filename)) for filename in chunk]
+        doc_freq = search_index.doc_frequencies({token for doc in docs for token in doc})
+        new_auto = dict(zip(chunk, rank_tags(docs, doc_freq, n_docs)))
+        search_index.set_auto_tags(new_auto)
+        for filename, auto in new_auto.items():
+            row = rows[filename]
+            old_auto = previous.get(filename, ())
+            user_tags = [t for t in TAG_RE.findall(row["title"]) if t not in old_auto]
+            # Sorted, like the titles process_conversation builds, so the next run matches them
+            title = title_with_tags(row["title"], sorted(set(user_tags).union(auto)))
+            if title != row["title"]:
+                row["title"] = title
+                tagged.append(row)
+    return tagged
+
+def _text_counts(counts, non_text):
+    if not non_text:
+        return counts
+    return {token: n - non_text.get(token, 0) for token, n in counts.items() if n > non_text.get(token, 0)}
+
+def _retitle_markdown(row):
+    # Put the tagged title into the "# title" line process_conversation wrote; returns the new content
+    filepath = os.path.join(EXPORT_DIR, row["filename"])
+    with open(filepath, "r", encoding="utf-8") as f:
+        _, sep, body = f.read().partition("\n")
+    content = f"# {row['title']}{sep}{body}"
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write(content)
+    return content
+
+def run_import(json_path, jobs=1, include_branches=False, store_backend="markdown", progress=None,
+               should_stop=None, auto_tags=True):
+    # Import into the Markdown folder or SQLite store; ImportCancelled (index untouched) once should_stop() is True
+    jobs = max(1, jobs)
+    use_store = store_backend == "sqlite"
+
+    if use_store:
+        store = ConversationStore(STORE_DB)
+        existing_tags = store.existing_tags()
+        manifest = store.load_manifest()
+        pending = []
+        seen_ids = set()
+    else:
+        if not os.path.exists(EXPORT_DIR):
+            os.makedirs(EXPORT_DIR)
+        journal = TagStore(TAG_JOURNAL)
+        manifest = load_manifest()
+        existing_tags = load_existing_tags(journal, manifest)
+    new_manifest = {}
     index_rows = []
 
-    updated_content = 0
+    # A missing (or older) search index means every conversation has to be tokenized once
+    search_index = SearchIndex(SEARCH_DB)
+    reindex = search_index.needs_reindex
+    pending_postings = []
+    indexed_filenames = set()
+
     new_count = 0
+    skipped = 0
 
     preserved_tags_log = []
     merged_tags_log = []
+    changed_log = []
+    changed_filenames = []
+    to_tag = {}  # filename -> row of new/changed conversations, for auto-tagging
+    non_text_counts = {}  # filename -> token counts of their non-text parts
+    auto_tagged = []
+    duplicate_clusters = []
+    total = 0
+    phase_seconds = {}  # load/extract/hash/tokenize/minhash -> summed seconds
+    phase_counts = {}
+
+    started = time.monotonic()
+    last_report = 0.0
+    try:
+        with open_export(json_path) as (f, total_bytes):
+            conversations = _timed_iter(iter_conversations(f), phase_seconds, "load")
+            results = iter_results(conversations, existing_tags, jobs, manifest,
+                                   include_branches, write_markdown=not use_store, reindex=reindex)
+            for result in results:
+                total += 1
+                for phase, seconds in result.pop("timings", {}).items():
+                    phase_seconds[phase] = phase_seconds.get(phase, 0.0) + seconds
+                    phase_counts[phase] = phase_counts.get(phase, 0) + 1
+                if result["status"] == "new":
+                    new_count += 1
+                elif result["status"] == "updated":
+                    changed_log.append(f"    - {result['row']['filename']}")
+                elif not result["preserved"]:
+                    skipped += 1
+                if result["status"] != "unchanged" or result["preserved"]:
+                    changed_filenames.append(result["row"]["filename"])
+                if result["status"] != "unchanged":
+                    to_tag[result["row"]["filename"]] = result["row"]
+                    if result.get("non_text_counts"):
+                        non_text_counts[result["row"]["filename"]] = result["non_text_counts"]
+                result.pop("non_text_counts", None)
+                if result["preserved"]:
+                    preserved_tags_log.append(result["preserved"])
+                if result["merged"]:
+                    merged_tags_log.append(result["merged"])
+                if result["id"] and result["manifest"]:
+                    new_manifest[result["id"]] = result["manifest"]
+                indexed_filenames.add(result["row"]["filename"])
+                if result.get("postings"):
+                    pending_postings.append((result["row"]["filename"],) + result.pop("postings"))
+                    if len(pending_postings) >= STORE_BATCH:
+                        search_index.write_batch(pending_postings)
+                        pending_postings = []
+                if use_store:
+                    seen_ids.add(result["id"] or result["row"]["filename"])
+                    pending.append(result)
+                    if len(pending) >= STORE_BATCH:
+                        store.write_results(pending)
+                        pending = []
+                index_rows.append(result["row"])
 
-    for convo in data:
-        title = convo.get("title", "Untitled Conversation").strip()
-        date_str = convo.get("create_time")
-        if date_str:
+                if should_stop and should_stop():
+                    raise ImportCancelled(f"Import cancelled after {total} conversations")
+                now = time.monotonic()
+                if progress and now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    bytes_read = f.buffer.tell()
+                    eta = (now - started) * (total_bytes - bytes_read) / bytes_read if bytes_read else None
+                    progress(total, bytes_read, total_bytes, eta)
+
+        # Work already written (Markdown files, search index batches) stays valid;
+        # only the final index and pruning steps below are skipped when cancelled,
+        # and the store's staged batches are discarded when it is closed
+        with metrics.span("import.index_write"):
+            search_index.write_batch(pending_postings)
+            search_index.retain(indexed_filenames)
+            if reindex:
+                search_index.mark_reindexed()
+        if auto_tags and to_tag:
             try:
-                if isinstance(date_str, (int, float)):
-                    dt = datetime.fromtimestamp(date_str)
-                else:
-                    dt = datetime.fromisoformat(date_str)
-                date = dt.strftime("%Y-%m-%d")
-            except Exception:
-                date = "unknown"
-        else:
-            date = "unknown"
-
-        filename = f"{date} - {safe_filename(title)}.md"
-        filepath = os.path.join(EXPORT_DIR, filename)
-
-        old_tags = set(existing_tags.get(filename, []))
-        title_wo_tags = " ".join(part for part in title.split() if not part.startswith("#"))
-
-        messages = extract_messages(convo)
-        clean_messages = [m if isinstance(m, str) else json.dumps(m, sort_keys=True) for m in messages]
-        new_msg_hash = compute_message_hash(messages)
-
-        final_tags = sorted(old_tags)
-        final_title = f"{title_wo_tags} {' '.join(final_tags)}".strip()
-        new_md_content = f"# {final_title}\n\n" + "\n\n".join(clean_messages)
-        new_file_hash = hashlib.sha1(new_md_content.encode("utf-8")).hexdigest()
-        existing_file_hash = file_hash(filepath)
-
-        should_write = True
-
-        if os.path.exists(filepath):
-            if new_file_hash != existing_file_hash:
-                if compute_message_hash(messages) != new_msg_hash:
-                    updated_content += 1
-                elif final_tags:
-                    preserved_tags_log.append(f"    - {filename} → {' '.join(final_tags)}")
-            else:
-                should_write = False
+                with metrics.span("import.auto_tag", count=len(to_tag)):
+                    auto_tagged = _auto_tag(search_index, to_tag, non_text_counts, should_stop)
+            except ImportError:
+                log("⚠️ Auto-tagging skipped: numpy and scipy are required")
+        if to_tag:
+            with metrics.span("import.near_duplicates") as fields:
+                duplicate_clusters = search_index.near_duplicate_clusters(filenames=to_tag)
+                fields["clusters"] = len(duplicate_clusters)
+        if use_store:
+            with metrics.span("import.store_write"):
+                store.write_results(pending)
+                store.commit_import(seen_ids, auto_tagged)
         else:
-            new_count += 1
-
-        if filename in existing_tags:
-            old_in_title = set(existing_tags[filename])
-            new_in_title = set(final_tags)
-            newly_added = new_in_title - old_in_title
-            if newly_added:
-                merged_tags_log.append(f"    - {filename} → added: {' '.join(sorted(newly_added))}")
-
-        if should_write:
-            with open(filepath, "w", encoding="utf-8") as md_file:
-                md_file.write(new_md_content.strip())
-
-        word_count = len(new_md_content.split())
-        index_rows.append({
-            "title": final_title,
-            "date": date,
-            "filename": filename,
-            "word_count": word_count
-        })
-
-    with open(INDEX_CSV, "w", encoding="utf-8", newline="") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=["title", "date", "filename", "word_count"])
-        writer.writeheader()
-        for row in index_rows:
-            writer.writerow(row)
-
-    skipped = len(data) - new_count
-
-    log(f"✅ Parsed {len(data)} conversations from {os.path.basename(json_path)}")
-    log(f"1. Total files imported: {len(data)}")
+            # Record the tagged titles so the next run sees these rows as unchanged
+            retitled = {row["filename"]: row for row in auto_tagged}
+            for entry in new_manifest.values():
+                row = retitled.get(entry["filename"])
+                if row is not None:
+                    content = _retitle_markdown(row)
+                    row["word_count"] = len(content.split())
+                    st = os.stat(os.path.join(EXPORT_DIR, row["filename"]))
+                    entry.update(title=row["title"], word_count=row["word_count"], mtime=st.st_mtime, size=st.st_size)
+            with metrics.span("import.csv_write", rows=len(index_rows)):
+                with open(INDEX_CSV, "w", encoding="utf-8", newline="") as csvfile:
+                    writer = csv.DictWriter(csvfile, fieldnames=["title", "date", "filename", "word_count"])
+                    writer.writeheader()
+                    for row in index_rows:
+                        writer.writerow(row)
+
+            save_manifest(new_manifest)
+            # Every title in the rewritten CSV already carries the journaled tags read above
+            # (plus any auto-tags), so those records are spent; kept, they would override the
+            # auto-tags. Edits journaled since then stay for the viewer and the next import.
+            journal.discard_read()
+    finally:
+        search_index.close()
+        if use_store:
+            store.close()
+
+    if progress:
+        progress(total, total_bytes, total_bytes, 0)
+
+    elapsed = time.monotonic() - started
+    for phase, seconds in phase_seconds.items():
+        metrics.record(f"import.{phase}", seconds, count=phase_counts.get(phase, total))
+    metrics.record("import", elapsed, conversations=total, new=new_count, changed=len(changed_log),
+                   jobs=jobs, store=store_backend)
+    metrics.flush()
+
+    log(f"✅ Parsed {total} conversations from {os.path.basename(json_path)}")
+    log(f"1. Total files imported: {total}")
     log(f"2. Original: {len(preserved_tags_log)} tags found and preserved")
     for entry in preserved_tags_log:
         log(entry)
@@ -161,7 +682,63 @@ def main():
     for entry in merged_tags_log:
         log(entry)
     log(f"4. New files added: {new_count}")
-    log(f"5. Skipped (no changes): {skipped}")
+    log(f"5. Changed (new message content): {len(changed_log)}")
+    for entry in changed_log:
+        log(entry)
+    log(f"6. Skipped (no changes): {skipped}")
+    log(f"7. Auto-tagged: {len(auto_tagged)}")
+    for row in auto_tagged:
+        log(f"    - {row['filename']} → {row['title']}")
+    log(f"8. Near-duplicates of new/changed conversations: {len(duplicate_clusters)} groups")
+    for cluster in duplicate_clusters:
+        log("    - " + " ≈ ".join(cluster))
+
+    return {
+        "total": total,
+        "new": new_count,
+        "changed": len(changed_log),
+        "skipped": skipped,
+        "rows": index_rows,
+        "changed_filenames": changed_filenames,
+        "near_duplicates": duplicate_clusters,
+        "elapsed": elapsed,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a ChatGPT conversations.json export to Markdown.")
+    parser.add_argument("json_path", nargs="?", help="path to conversations.json or the export .zip")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes to use (default: 1)")
+    parser.add_argument("--include-branches", action="store_true",
+                        help="also export regenerated/abandoned branches, not just the current thread")
+    parser.add_argument("--store", choices=["markdown", "sqlite"], default="markdown",
+                        help=f"markdown: {EXPORT_DIR}/ + {INDEX_CSV} (default); sqlite: single {STORE_DB} database")
+    parser.add_argument("--no-auto-tags", action="store_true",
+                        help="don't add TF-IDF tags to new or changed conversations")
+    parser.add_argument("--export-markdown", metavar="DIR",
+                        help=f"write Markdown files for every conversation in {STORE_DB} to DIR and exit")
+    args = parser.parse_args(argv)
+
+    if args.export_markdown:
+        store = ConversationStore.open_existing(STORE_DB)
+        if store is None:
+            # Opening it normally would create an empty store the viewer then switches to
+            print(f"❌ No {STORE_DB} here to export from (only imports with --store sqlite create one).")
+            log(f"❌ Markdown export failed — {STORE_DB} not found.")
+            return
+        try:
+            written = store.export_markdown([row["filename"] for row in store.load_index()], args.export_markdown)
+        finally:
+            store.close()
+        log(f"✅ Exported {written} conversations from {STORE_DB} to {args.export_markdown}")
+        return
+
+    if not args.json_path:
+        print("❌ No input file provided. Usage: python conversation_parser.py <conversations.json | export.zip> [--jobs N]")
+        log("❌ Parser run failed — No input file provided.")
+        return
+
+    run_import(args.json_path, jobs=args.jobs, include_branches=args.include_branches, store_backend=args.store,
+               auto_tags=not args.no_auto_tags)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,242 @@
+import os
+import sqlite3
+from contextlib import closing
+
+STORE_DB = "feralcat.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id          TEXT PRIMARY KEY,
+    filename    TEXT NOT NULL UNIQUE,
+    title       TEXT NOT NULL,
+    date        TEXT NOT NULL,
+    word_count  INTEGER NOT NULL DEFAULT 0,
+    msg_hash    TEXT,
+    update_time REAL,
+    branches    INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    seq             INTEGER NOT NULL,
+    role            TEXT,
+    timestamp       REAL,
+    body            TEXT NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+);
+CREATE TABLE IF NOT EXISTS tags (
+    conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    tag             TEXT NOT NULL,
+    PRIMARY KEY (conversation_id, tag)
+);
+CREATE INDEX IF NOT EXISTS tags_by_tag ON tags(tag);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', lower(hex(randomblob(16))));
+"""
+
+# An import's batches, merged into the tables above by commit_import
+STAGING_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS staged_conversations (
+    id           TEXT PRIMARY KEY,
+    filename     TEXT NOT NULL,
+    title        TEXT NOT NULL,
+    date         TEXT NOT NULL,
+    word_count   INTEGER NOT NULL,
+    msg_hash     TEXT,
+    update_time  REAL,
+    branches     INTEGER NOT NULL,
+    has_messages INTEGER NOT NULL
+);
+CREATE TEMP TABLE IF NOT EXISTS staged_messages (
+    conversation_id TEXT NOT NULL,
+    seq             INTEGER NOT NULL,
+    role            TEXT,
+    timestamp       REAL,
+    body            TEXT NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+);
+CREATE TEMP TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY);
+"""
+
+def title_tags(title):
+    return [word for word in title.split() if word.startswith("#")]
+
+
+class ConversationStore:
+    """Single-file SQLite alternative to markdown_exports/ + feralcat_index.csv."""
+
+    def __init__(self, path=STORE_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def open_existing(cls, path=STORE_DB):
+        # The viewer only switches to the store once the parser has created one
+        return cls(path) if os.path.exists(path) else None
+
+    def close(self):
+        self.conn.close()
+
+    # --- import side ---
+
+    def load_manifest(self):
+        # Same shape as conversation_parser's JSON manifest, minus file stats
+        manifest = {}
+        for r in self.conn.execute(
+                "SELECT id, filename, title, word_count, msg_hash, update_time, branches FROM conversations"):
+            manifest[r["id"]] = {
+                "msg_hash": r["msg_hash"],
+                "update_time": r["update_time"],
+                "title": r["title"],
+                "filename": r["filename"],
+                "word_count": r["word_count"],
+                "branches": bool(r["branches"]),
+            }
+        return manifest
+
+    def existing_tags(self):
+        # Conversation id -> tags in its title, like conversation_parser.load_existing_tags
+        return {r["id"]: title_tags(r["title"]) for r in self.conn.execute("SELECT id, title FROM conversations")}
+
+    def write_results(self, results):
+        # Stage a batch of process_conversation results in TEMP tables. They live outside
+        # the database file, so the viewer can keep reading and saving tags while an
+        # import runs; nothing reaches the index until commit_import merges the batches
+        # in one short transaction, and closing the store without it discards them.
+        self.conn.executescript(STAGING_SCHEMA)
+        with self.conn:
+            for result in results:
+                row = result["row"]
+                convo_id = result["id"] or row["filename"]
+                entry = result["manifest"] or {}
+                messages = result.get("messages")
+                self.conn.execute(
+                    """INSERT OR REPLACE INTO staged_conversations
+                       (id, filename, title, date, word_count, msg_hash, update_time, branches, has_messages)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (convo_id, row["filename"], row["title"], row["date"], row["word_count"],
+                     entry.get("msg_hash"), entry.get("update_time"), int(entry.get("branches", False)),
+                     int(messages is not None)))
+                self.conn.execute("DELETE FROM staged_messages WHERE conversation_id = ?", (convo_id,))
+                if messages is not None:
+                    self.conn.executemany(
+                        "INSERT INTO staged_messages (conversation_id, seq, role, timestamp, body) VALUES (?, ?, ?, ?, ?)",
+                        ((convo_id, seq, role, ts, body) for seq, (role, ts, body) in enumerate(messages)))
+
+    def commit_import(self, seen_ids, retitled_rows=()):
+        # Publish the staged batches in one transaction: drop conversations missing from
+        # the latest export (mirroring the CSV), upsert the staged ones and apply the
+        # import's retitled rows
+        self.conn.executescript(STAGING_SCHEMA)
+        with self.conn:
+            self.conn.execute("DELETE FROM seen")
+            self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((i,) for i in seen_ids))
+            self.conn.execute("DELETE FROM conversations WHERE id NOT IN (SELECT id FROM seen)")
+            # Conversations are only ever matched by id. What's left after the prune is
+            # exactly the staged set, whose filenames are unique, but a renamed one may
+            # take a name another still holds until its own row is upserted, so park
+            # the changing names on placeholders first.
+            self.conn.execute(
+                """UPDATE conversations SET filename = char(0) || id WHERE EXISTS
+                   (SELECT 1 FROM staged_conversations s WHERE s.id = conversations.id
+                    AND s.filename != conversations.filename)""")
+            self.conn.execute(
+                """INSERT INTO conversations (id, filename, title, date, word_count, msg_hash, update_time, branches)
+                   SELECT id, filename, title, date, word_count, msg_hash, update_time, branches
+                   FROM staged_conversations WHERE true ORDER BY rowid
+                   ON CONFLICT(id) DO UPDATE SET
+                       filename = excluded.filename, title = excluded.title, date = excluded.date,
+                       word_count = excluded.word_count, msg_hash = excluded.msg_hash,
+                       update_time = excluded.update_time, branches = excluded.branches""")
+            for convo_id, title in self.conn.execute("SELECT id, title FROM staged_conversations").fetchall():
+                self._replace_tags(convo_id, title)
+            self.conn.execute(
+                """DELETE FROM messages WHERE conversation_id IN
+                   (SELECT id FROM staged_conversations WHERE has_messages)""")
+            self.conn.execute(
+                """INSERT INTO messages (conversation_id, seq, role, timestamp, body)
+                   SELECT conversation_id, seq, role, timestamp, body FROM staged_messages""")
+            self._update_titles(retitled_rows)
+            self._bump_generation()
+        self.conn.executescript(
+            "DROP TABLE staged_conversations; DROP TABLE staged_messages; DROP TABLE seen;")
+
+    def generation(self):
+        # Random token replaced by every write, for caches of what the store holds
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def _bump_generation(self):
+        self.conn.execute("UPDATE meta SET value = lower(hex(randomblob(16))) WHERE key = 'generation'")
+
+    def _replace_tags(self, convo_id, title):
+        self.conn.execute("DELETE FROM tags WHERE conversation_id = ?", (convo_id,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO tags (conversation_id, tag) VALUES (?, ?)",
+            ((convo_id, tag.lstrip("#")) for tag in title_tags(title)))
+
+    # --- viewer side ---
+
+    def load_index(self):
+        # Rows shaped like feralcat_index.csv (all values as strings)
+        return [
+            {"title": r["title"], "date": r["date"], "filename": r["filename"], "word_count": str(r["word_count"])}
+            for r in self.conn.execute("SELECT title, date, filename, word_count FROM conversations ORDER BY rowid")
+        ]
+
+    def save_titles(self, rows):
+        # Persist edited titles/tags for the given index rows in a single transaction
+        with self.conn:
+            self._update_titles(rows)
+            self._bump_generation()
+
+    def _update_titles(self, rows):
+        for row in rows:
+            hit = self.conn.execute(
+                "SELECT id FROM conversations WHERE filename = ?", (row["filename"],)).fetchone()
+            if hit:
+                self.conn.execute("UPDATE conversations SET title = ? WHERE id = ?", (row["title"], hit["id"]))
+                self._replace_tags(hit["id"], row["title"])
+
+    def version(self, filename):
+        # Changes whenever read_markdown(filename) would return something different
+        r = self.conn.execute("SELECT msg_hash, title FROM conversations WHERE filename = ?", (filename,)).fetchone()
+        return f"{r['msg_hash']}:{r['title']}" if r else None
+
+    def read_markdown(self, filename):
+        # Rebuild exactly what the Markdown exporter would have written for this conversation
+        r = self.conn.execute("SELECT id, title FROM conversations WHERE filename = ?", (filename,)).fetchone()
+        if r is None:
+            return None
+        bodies = [b for (b,) in self.conn.execute(
+            "SELECT body FROM messages WHERE conversation_id = ? ORDER BY seq", (r["id"],))]
+        return (f"# {r['title']}\n\n" + "\n\n".join(bodies)).strip()
+
+    def search_content(self, query):
+        # Filenames whose title or message bodies contain query (case-insensitive for ASCII)
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with closing(self.conn.execute(
+                """SELECT filename FROM conversations WHERE title LIKE ? ESCAPE '\\'
+                   UNION
+                   SELECT c.filename FROM conversations c JOIN messages m ON m.conversation_id = c.id
+                   WHERE m.body LIKE ? ESCAPE '\\'""", (pattern, pattern))) as cur:
+            return {r["filename"] for r in cur}
+
+    def export_markdown(self, filenames, dest_dir):
+        # On-demand Markdown output; returns the number of files written
+        os.makedirs(dest_dir, exist_ok=True)
+        written = 0
+        for filename in filenames:
+            content = self.read_markdown(filename)
+            if content is None:
+                continue
+            with open(os.path.join(dest_dir, filename), "w", encoding="utf-8") as f:
+                f.write(content)
+            written += 1
+        return written
@@ -0,0 +1,127 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from tag_store import TAG_RE
+
+# Ordinal used for rows whose date can't be parsed (e.g. "unknown")
+NO_DATE = -1
+
+
+def _date_ordinal(date_str):
+    try:
+        return date.fromisoformat(date_str).toordinal()
+    except (TypeError, ValueError):
+        return NO_DATE
+
+
+class FilterIndex:
+    """Precomputed tag and date columns over the index rows.
+
+    Rows are addressed by their position in the rows list. Tags map to sets of
+    positions; dates are kept as ordinals sorted once so a range is two bisects.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.tags = {}  # tag -> set of positions
+        self._row_tags = []  # position -> tuple of tags, for in-place edits
+        self._undated = set()  # rows with an empty date always pass the date filter
+        ordinals = array('i')
+        for pos, row in enumerate(rows):
+            tags = tuple(dict.fromkeys(TAG_RE.findall(row.get('title', ''))))
+            self._row_tags.append(tags)
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(pos)
+            date_str = row.get('date', '')
+            if not date_str:
+                self._undated.add(pos)
+            ordinals.append(_date_ordinal(date_str))
+        order = sorted(range(len(rows)), key=ordinals.__getitem__)
+        self._sorted_ordinals = array('i', (ordinals[p] for p in order))
+        self._sorted_positions = array('I', order)
+
+    def columns(self):
+        # Plain-data form of the precomputed columns, for index_snapshot
+        return {
+            "tags": {tag: sorted(positions) for tag, positions in self.tags.items()},
+            "row_tags": self._row_tags,
+            "undated": sorted(self._undated),
+            "sorted_ordinals": self._sorted_ordinals.tobytes(),
+            "sorted_positions": self._sorted_positions.tobytes(),
+        }
+
+    @classmethod
+    def from_columns(cls, rows, columns):
+        # Rebuild from columns() output without re-parsing titles or dates
+        self = cls.__new__(cls)
+        self.rows = rows
+        self._row_tags = columns["row_tags"]
+        self.tags = {tag: set(positions) for tag, positions in columns["tags"].items()}
+        self._undated = set(columns["undated"])
+        self._sorted_ordinals = array('i')
+        self._sorted_ordinals.frombytes(columns["sorted_ordinals"])
+        self._sorted_positions = array('I')
+        self._sorted_positions.frombytes(columns["sorted_positions"])
+        return self
+
+    def tag_counts(self):
+        return {tag: len(positions) for tag, positions in self.tags.items() if positions}
+
+    def row_tags(self, pos):
+        return self._row_tags[pos]
+
+    def positions_in_range(self, start, end):
+        # Positions whose date lies in [start, end] ('yyyy-MM-dd' strings), plus undated rows
+        lo = bisect_left(self._sorted_ordinals, _date_ordinal(start))
+        hi = bisect_right(self._sorted_ordinals, _date_ordinal(end))
+        hits = set(self._sorted_positions[lo:hi])
+        hits |= self._undated
+        return hits
+
+    def candidates(self, active_tags=(), date_range=(None, None)):
+        """Sorted positions passing the tag (AND) and date filters, or None for all rows.
+
+        Like the viewer, the date filter only applies when both ends are set.
+        """
+        sets = []
+        for tag in active_tags:
+            positions = self.tags.get(tag)
+            if not positions:
+                return []
+            sets.append(positions)
+        start, end = date_range
+        if start and end:
+            sets.append(self.positions_in_range(start, end))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sorted(sets[0].intersection(*sets[1:]))
+
+    def append_row(self, row):
+        # Index a row the caller has just appended to self.rows
+        pos = len(self._row_tags)
+        tags = tuple(dict.fromkeys(TAG_RE.findall(row.get('title', ''))))
+        self._row_tags.append(tags)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(pos)
+        date_str = row.get('date', '')
+        if not date_str:
+            self._undated.add(pos)
+        ordinal = _date_ordinal(date_str)
+        i = bisect_right(self._sorted_ordinals, ordinal)
+        self._sorted_ordinals.insert(i, ordinal)
+        self._sorted_positions.insert(i, pos)
+
+    def update_title(self, pos, title):
+        # Re-tag one row in place after its title/tags were edited
+        for tag in self._row_tags[pos]:
+            positions = self.tags.get(tag)
+            if positions is not None:
+                positions.discard(pos)
+                if not positions:
+                    del self.tags[tag]
+        tags = tuple(dict.fromkeys(TAG_RE.findall(title)))
+        self._row_tags[pos] = tags
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(pos)
@@ -0,0 +1,161 @@
+import csv
+import hashlib
+import marshal
+import mmap
+import os
+import sys
+
+from filter_index import FilterIndex
+from tag_store import TAG_JOURNAL, title_with_tags
+
+SNAPSHOT_PATH = "feralcat_index.snap"
+INDEX_CSV = "feralcat_index.csv"
+
+# Bump when the layout of the snapshot changes
+SNAPSHOT_VERSION = 1
+
+# Sources up to this size are also hashed, so a touched-but-unchanged file keeps the snapshot valid
+HASH_LIMIT = 64 * 1024 * 1024
+
+
+def _source_stats(sources):
+    # (path, mtime_ns, size) per source; missing files count as (path, 0, -1)
+    stats = []
+    for path in sources:
+        try:
+            st = os.stat(path)
+            stats.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            stats.append((path, 0, -1))
+    return stats
+
+
+def _sources_hash(stats):
+    if sum(max(size, 0) for _, _, size in stats) > HASH_LIMIT:
+        return None
+    h = hashlib.sha1()
+    for path, _, size in stats:
+        h.update(path.encode("utf-8"))
+        if size >= 0:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+    return h.hexdigest()
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return marshal.loads(mm)
+        except (ValueError, OSError):
+            # Empty file or no mmap support: fall back to a plain read
+            f.seek(0)
+            return marshal.loads(f.read())
+
+
+def load_snapshot(stats, path=SNAPSHOT_PATH):
+    """(rows, FilterIndex) from the snapshot if it still matches stats, else None.
+
+    stats comes from source_signature or store_signature. File sources are
+    checked by mtime and size first; if those moved, by content hash.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        data = _read(path)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != (SNAPSHOT_VERSION, sys.version_info[:2]):
+        return None
+    if [tuple(s) for s in data["sources"]] != stats:
+        if data["hash"] is None or _sources_hash(stats) != data["hash"]:
+            return None
+        # Same content under new mtimes: record them so the next start skips the hash
+        data["sources"] = stats
+        try:
+            _write(data, path)
+        except OSError:
+            pass  # Read-only folder: the snapshot is still valid, just hashed again next time
+    rows = [{"title": title, "date": date, "filename": filename, "word_count": word_count}
+            for title, date, filename, word_count in zip(*data["rows"])]
+    return rows, FilterIndex.from_columns(rows, data["columns"])
+
+
+def source_signature(sources):
+    # Take this before reading the sources, so a change made while they are being
+    # read leaves the saved snapshot stale rather than wrongly current
+    stats = _source_stats(sources)
+    return stats, _sources_hash(stats)
+
+
+def store_signature(store):
+    # SQLite touches the -wal file whenever the store is opened, so its files' stats
+    # say nothing; the store's generation changes with each write instead. Read it
+    # before the rows, for the same reason as in source_signature.
+    return [(store.path, store.generation())], None
+
+
+def save_snapshot(rows, filter_index, signature, path=SNAPSHOT_PATH):
+    stats, digest = signature
+    data = {
+        "version": (SNAPSHOT_VERSION, sys.version_info[:2]),
+        "sources": stats,
+        "hash": digest,
+        # Column-wise: one list per index field
+        "rows": [[str(row.get(field, "")) for row in rows] for field in ("title", "date", "filename", "word_count")],
+        "columns": filter_index.columns(),
+    }
+    _write(data, path)
+
+
+def read_index_rows(store=None, tag_store=None):
+    # Index rows from the store, or from the CSV with journaled tag edits applied; None if no index
+    if store:
+        return store.load_index()
+    if not os.path.exists(INDEX_CSV):
+        return None
+    with open(INDEX_CSV, "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if tag_store:
+        for row in rows:
+            tags = tag_store.get(row["filename"])
+            if tags is not None:
+                row["title"] = title_with_tags(row["title"], tags)
+    return rows
+
+
+def load_index(store=None, tag_store=None):
+    """(rows, FilterIndex, from_snapshot) for the store or the Markdown index.
+
+    Tag and date columns are computed once per index change and kept in the
+    snapshot, so an unchanged index loads without re-parsing. rows is None
+    when there is no index yet.
+    """
+    if store:
+        signature = store_signature(store)
+        stats = signature[0]
+    else:
+        sources = [INDEX_CSV, TAG_JOURNAL]
+        stats = _source_stats(sources)
+    snapshot = load_snapshot(stats)
+    if snapshot:
+        return snapshot + (True,)
+    if not store:
+        signature = source_signature(sources)
+    rows = read_index_rows(store, tag_store)
+    if rows is None:
+        return None, None, False
+    filter_index = FilterIndex(rows)
+    try:
+        save_snapshot(rows, filter_index, signature)
+    except OSError:
+        pass  # Read-only folder: just rebuild next time
+    return rows, filter_index, False
+
+
+def _write(data, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        marshal.dump(data, f)
+    os.replace(tmp_path, path)
@@ -1,19 +1,36 @@
 from PySide6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QListWidget, QTextBrowser,
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QListView, QTextBrowser,
     QLabel, QPushButton, QFileDialog, QCheckBox, QMenuBar, QMenu, QScrollArea, QGroupBox, QFormLayout, QLineEdit,
-    QComboBox, QToolButton, QDateEdit, QMessageBox, QInputDialog, QStyle  # <-- Add QStyle
+    QComboBox, QToolButton, QDateEdit, QMessageBox, QInputDialog, QStyle, QTextEdit, QProgressBar  # <-- Add QStyle
 )
-from PySide6.QtCore import Qt, QDate
-from PySide6.QtGui import QIcon  # Add this import
+from PySide6.QtCore import Qt, QDate, QAbstractListModel, QFileSystemWatcher, QModelIndex, QObject, QRunnable, QThreadPool, QTimer, Signal
+from PySide6.QtGui import QIcon, QColor, QKeySequence, QShortcut, QTextBlockFormat, QTextCharFormat, QTextCursor  # Add this import
 from ui_constants import ButtonConstants
+from conversation_store import ConversationStore, STORE_DB
+from search_index import SEARCH_DB, SearchIndex
+from search_engine import find_hits, read_markdown_file, row_label, search_positions
+from render_cache import RenderCache, markdown_to_html, outline_label, split_sections
+from filter_index import FilterIndex
+from index_snapshot import load_index, read_index_rows
+from tag_store import TAG_RE, TagStore, title_with_tags
+import metrics
+from bulk_export import EXPORT_FORMATS, ExportCancelled, collect_for_clipboard, export_conversations
 import os
 import csv
-import re
-import markdown  # NEW: proper markdown rendering
-import subprocess
+import sqlite3
+import threading
+import time
 
 INDEX_CSV = 'feralcat_index.csv'
 EXPORT_DIR = 'markdown_exports'
+SEARCH_DEBOUNCE_MS = 150
+# Rows above and below the selection rendered ahead of time
+PREFETCH_NEIGHBORS = 1
+# Quiet period after the last file-system event before the index is refreshed
+WATCH_DEBOUNCE_MS = 300
+
+# Seconds between export progress updates
+EXPORT_PROGRESS_INTERVAL = 0.1
 
 class FeralCatViewer(QWidget):
     def __init__(self):
@@ -23,8 +40,38 @@ class FeralCatViewer(QWidget):
         self.active_tags = set()
         self.date_range = (None, None)  # (start_date, end_date)
         self.last_search_query = ""  # Store last search query for highlighting
+        self.store = ConversationStore.open_existing()  # SQLite backend if the parser created one
+        self.tag_store = TagStore()  # Tag edits journal (Markdown backend); the store keeps its own tags
+        self.index = []
+        self.filter_index = FilterIndex(self.index)
+        self.sidebar_model = ConversationListModel(self)
+        self.render_cache = RenderCache()
+        self._prefetching = set()  # Render keys queued on the worker pool
+        self._hits = []  # Highlighted (position, length) ranges in the viewer document
+        self._hit_index = -1
+        self._import_cancel = None  # threading.Event of the running import, if any
+        self._import_edits = None  # filename -> tags set while the running import works from an older index
+        self._export_cancel = None  # threading.Event of the running bulk export, if any
+        # Imports and exports get their own threads: on the global pool (one thread
+        # on a single-core machine) they would hold up searches and prefetching
+        self._long_task_pool = QThreadPool(self)
+        self._long_task_pool.setMaxThreadCount(2)
+        self._restore_scroll = None  # Sidebar scroll position to restore after a refresh
+        self._shown_key = None  # Render key of the conversation in the viewer
+        self._sections = []  # Markdown sections of the conversation in the viewer
+        self._section_starts = []  # Document position of each section rendered so far
+        self._search_generation = 0  # Bumped per search; stale worker results are ignored
+        self._search_cancel = None  # threading.Event of the search in flight
+        self._search_started = 0.0  # perf_counter() when the running search was started
+        self._pending_select = None  # Filename to select once it streams into the sidebar
+        self._related_for = None  # Filename whose related conversations are being looked up
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self.apply_filters)
         self.setup_ui()
         self.load_index()
+        self.setup_watcher()
         self.load_theme()  # Load the theme on startup
 
     def setup_ui(self):
@@ -40,10 +87,18 @@ class FeralCatViewer(QWidget):
         file_menu.addAction("Exit", self.close)
         tools_menu.addAction("Refresh Index", self.load_index)
         tools_menu.addAction("Run Parser", self.run_parser_script)
+        tools_menu.addAction(ButtonConstants.EXPORT_MD, self.export_filtered_markdown)
+        tools_menu.addAction("Export Filtered...", self.export_filtered)
         tools_menu.addAction("Toggle Dark Mode", self.toggle_dark_mode)
         # Add "Load Icon" to Tools menu
         tools_menu.addAction("Load Icon", self.load_icon)
         tools_menu.addAction("Copy Tags to Clipboard", self.copy_tags_to_clipboard)
+        tools_menu.addAction("Tag All Filtered...", self.tag_filtered)
+        tools_menu.addAction("Untag All Filtered...", self.untag_filtered)
+        tools_menu.addAction("Show Near-Duplicates", self.show_near_duplicates)
+        self.profile_action = tools_menu.addAction("Profile (cProfile)")
+        self.profile_action.setCheckable(True)
+        self.profile_action.toggled.connect(self.toggle_profiling)
         help_menu.addAction("About", self.show_about)
 
         menubar.addMenu(file_menu)
@@ -106,12 +161,21 @@ class FeralCatViewer(QWidget):
 
         self.search_box = QLineEdit()
         self.search_box.setPlaceholderText("Search titles...")
-        self.search_box.textChanged.connect(self.apply_filters)
-
-        self.sidebar = QListWidget()
-        self.sidebar.currentItemChanged.connect(self.load_selected_convo)
-
-        sidebar_container.addWidget(self.search_box)
+        self.search_box.textChanged.connect(self._schedule_search)
+        self.rank_checkbox = QCheckBox("Rank")
+        self.rank_checkbox.setToolTip('Order results by relevance (BM25); "quoted phrases" must match')
+        self.rank_checkbox.toggled.connect(self.apply_filters)
+        search_bar = QHBoxLayout()
+        search_bar.addWidget(self.search_box)
+        search_bar.addWidget(self.rank_checkbox)
+
+        # Model/view list: only the rows scrolled into view are ever materialized
+        self.sidebar = QListView()
+        self.sidebar.setUniformItemSizes(True)
+        self.sidebar.setModel(self.sidebar_model)
+        self.sidebar.selectionModel().currentChanged.connect(self.load_selected_convo)
+
+        sidebar_container.addLayout(search_bar)
         sidebar_container.addWidget(self.sidebar)
 
         # Right Panel: Viewer + Meta
@@ -119,6 +183,36 @@ class FeralCatViewer(QWidget):
         self.meta_label = QLabel("Select a conversation to view metadata.")
         self.viewer = QTextBrowser()
         self.viewer.setOpenExternalLinks(True)
+        # Long conversations are rendered a section at a time as the view nears the end
+        self.viewer.verticalScrollBar().valueChanged.connect(self._on_viewer_scrolled)
+        self.outline_box = QComboBox()
+        self.outline_box.setToolTip("Jump to section")
+        self.outline_box.setMaximumWidth(300)
+        self.outline_box.activated.connect(self.jump_to_section)
+        self.related_box = QComboBox()
+        self.related_box.setToolTip("Related conversations (similar content)")
+        self.related_box.setMaximumWidth(300)
+        self.related_box.activated.connect(self.open_related)
+        self.related_box.setVisible(False)
+
+        # --- Search hit navigation (moves the cursor, never re-renders) ---
+        self.prev_hit_button = QToolButton()
+        self.prev_hit_button.setText("▲")
+        self.prev_hit_button.clicked.connect(self.prev_hit)
+        self.next_hit_button = QToolButton()
+        self.next_hit_button.setText("▼")
+        self.next_hit_button.clicked.connect(self.next_hit)
+        self.hit_label = QLabel("")
+        QShortcut(QKeySequence(QKeySequence.FindNext), self, self.next_hit)
+        QShortcut(QKeySequence(QKeySequence.FindPrevious), self, self.prev_hit)
+
+        hit_bar = QHBoxLayout()
+        hit_bar.addWidget(self.meta_label, 1)
+        hit_bar.addWidget(self.outline_box)
+        hit_bar.addWidget(self.related_box)
+        hit_bar.addWidget(self.hit_label)
+        hit_bar.addWidget(self.prev_hit_button)
+        hit_bar.addWidget(self.next_hit_button)
 
         self.copy_button = QPushButton("Copy to Clipboard")
         self.copy_button.clicked.connect(self.copy_to_clipboard)
@@ -142,7 +236,36 @@ class FeralCatViewer(QWidget):
         tag_edit_bar.addWidget(self.save_tag_button)
         tag_edit_bar.addWidget(self.remove_tag_button)  # Add to layout
 
-        right_panel.addWidget(self.meta_label)
+        # --- Import progress (hidden unless the parser is running) ---
+        self.import_label = QLabel("")
+        self.import_progress = QProgressBar()
+        self.import_progress.setRange(0, 1000)
+        self.import_cancel_button = QPushButton("Cancel")
+        self.import_cancel_button.clicked.connect(self.cancel_import)
+        self.import_bar = QWidget()
+        import_layout = QHBoxLayout(self.import_bar)
+        import_layout.setContentsMargins(0, 0, 0, 0)
+        import_layout.addWidget(self.import_label)
+        import_layout.addWidget(self.import_progress, 1)
+        import_layout.addWidget(self.import_cancel_button)
+        self.import_bar.setVisible(False)
+
+        # --- Bulk export progress (hidden unless an export is running) ---
+        self.export_label = QLabel("")
+        self.export_progress = QProgressBar()
+        self.export_cancel_button = QPushButton("Cancel")
+        self.export_cancel_button.clicked.connect(self.cancel_export)
+        self.export_bar = QWidget()
+        export_layout = QHBoxLayout(self.export_bar)
+        export_layout.setContentsMargins(0, 0, 0, 0)
+        export_layout.addWidget(self.export_label)
+        export_layout.addWidget(self.export_progress, 1)
+        export_layout.addWidget(self.export_cancel_button)
+        self.export_bar.setVisible(False)
+
+        right_panel.addWidget(self.import_bar)
+        right_panel.addWidget(self.export_bar)
+        right_panel.addLayout(hit_bar)
         right_panel.addWidget(self.viewer)
         right_panel.addWidget(self.copy_button)
         right_panel.addWidget(self.close_button)
@@ -172,30 +295,54 @@ class FeralCatViewer(QWidget):
         self.tag_search_box.setCurrentIndex(-1)
         self.apply_filters()
 
-    def load_index(self):
-        self.sidebar.clear()
-        self.index = []
-        tag_counts = {}
+    @property
+    def filtered_rows(self):
+        # Rows currently listed in the sidebar, in display order
+        return self.sidebar_model.visible_rows()
 
-        if not os.path.exists(INDEX_CSV):
-            return
+    def _selected_row(self):
+        index = self.sidebar.currentIndex()
+        return self.sidebar_model.row_at(index.row()) if index.isValid() else None
 
-        with open(INDEX_CSV, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                self.index.append(row)
-                # Count tags
-                match = re.findall(r'#(\w+)', row.get('title', ''))
-                for tag in match:
-                    tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    def _selected_position(self):
+        # Position of the selected row in self.index, or -1
+        index = self.sidebar.currentIndex()
+        return self.sidebar_model.position_at(index.row()) if index.isValid() else -1
 
+    def load_index(self):
+        with metrics.span("viewer.load_index") as fields:
+            fields["snapshot"] = self._load_index()
+            fields["rows"] = len(self.index)
+
+    def _load_index(self):
+        # Returns whether the index came from the snapshot
+        self.index = []
+        self.filter_index = FilterIndex(self.index)
+        self.sidebar_model.set_source(self.index)
+
+        # Tag and date columns are computed once per index change, not per filter change
+        self.tag_store = TagStore()  # An import may have folded the journal into the CSV
+        rows, filter_index, from_snapshot = load_index(self.store, self.tag_store)
+        if rows is None:
+            return False
+        self.index, self.filter_index = rows, filter_index
+        self._refresh_tag_box()
+        self.apply_filters()
+        return from_snapshot
+
+    def _refresh_tag_box(self):
         # Clear and re-add placeholder
         self.tag_search_box.clear()
         self.tag_search_box.addItem("Tags...")  # Placeholder
-        for tag in sorted(tag_counts):
+        for tag in sorted(self.filter_index.tag_counts()):
             self.tag_search_box.addItem(tag)
         self.tag_search_box.setCurrentIndex(0)  # Default to placeholder
 
+    def _apply_title_edits(self, positions):
+        # Tags changed on some rows: update the columns in place instead of reloading the index
+        for pos in positions:
+            self.filter_index.update_title(pos, self.index[pos]['title'])
+        self._refresh_tag_box()
         self.apply_filters()
 
     def filter_by_tags(self):
@@ -203,81 +350,288 @@ class FeralCatViewer(QWidget):
         pass  # Filtering now handled in apply_filters
 
     def apply_filters(self):
+        # Restart the search for the current filters on the worker pool. Any search
+        # still running is cancelled; its late results are dropped by generation.
+        self._search_started = time.perf_counter()
         query = self.search_box.text().strip().lower()
+        if query != self.last_search_query and self._sections:
+            # Re-highlight the open conversation in place for the new query. Ask the
+            # viewer, not the sidebar: the reset below clears the sidebar's selection.
+            self.last_search_query = query
+            self.highlight_hits()
         self.last_search_query = query  # Store for highlighting
-        self.sidebar.clear()
-        start, end = self.date_range
-        self.filtered_rows = []  # Store filtered rows for later access
+        if self._search_cancel is not None:
+            self._search_cancel.set()
+        self._search_generation += 1
+        self._search_cancel = threading.Event()
 
-        for row in self.index:
-            tags_in_title = set(re.findall(r'#(\w+)', row['title']))
-            date_str = row.get('date', '')
-            date_ok = True
-            if start and end and date_str:
-                try:
-                    row_date = QDate.fromString(date_str, "yyyy-MM-dd")
-                    date_ok = (not start or row_date >= start) and (not end or row_date <= end)
-                except Exception:
-                    date_ok = True
-
-            full_title = f"{row['date']} - {row['title']}"
-            title_match = query in full_title.lower() if query else True
-            content_match = False
-
-            # Always check content if searching
-            if query:
-                filepath = os.path.join(EXPORT_DIR, row['filename'])
-                if os.path.exists(filepath):
-                    try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            content = f.read().lower()
-                            content_match = query in content
-                    except Exception:
-                        content_match = False
-
-            # Show if tag/date filter passes, and either title or content matches (or no query)
-            if (not self.active_tags or self.active_tags.issubset(tags_in_title)) and date_ok:
-                if (not query) or title_match or content_match:
-                    self.sidebar.addItem(full_title)
-                    self.filtered_rows.append(row)
+        self.sidebar_model.set_source(self.index)
+        start, end = self.date_range
+        date_range = (start.toString("yyyy-MM-dd"), end.toString("yyyy-MM-dd")) if (start and end) else (None, None)
+        task = _SearchTask(
+            self._search_generation, self._search_cancel, list(self.index), query,
+            self.filter_index.candidates(self.active_tags, date_range), self.store.path if self.store else None,
+            ranked=self.rank_checkbox.isChecked(),
+        )
+        task.signals.batch.connect(self._on_search_batch)
+        task.signals.finished.connect(self._on_search_finished)
+        QThreadPool.globalInstance().start(task)
+        metrics.record("viewer.apply_filters", time.perf_counter() - self._search_started,
+                       tags=len(self.active_tags), query_chars=len(query), ranked=self.rank_checkbox.isChecked())
+
+    def _schedule_search(self):
+        # Coalesce rapid keystrokes: only search once typing pauses
+        self._search_timer.start()
+
+    def _on_search_batch(self, generation, positions):
+        if generation != self._search_generation:
+            return
+        self.sidebar_model.extend_mask(positions)
+        if self._pending_select:
+            self._reselect(self._pending_select)
 
+    def _on_search_finished(self, generation):
+        if generation != self._search_generation:
+            return
+        metrics.record("viewer.search", time.perf_counter() - self._search_started,
+                       matches=self.sidebar_model.rowCount(), rows=len(self.index))
+        self._pending_select = None
+        if self._restore_scroll is not None:
+            self.sidebar.verticalScrollBar().setValue(self._restore_scroll)
+            self._restore_scroll = None
         # If nothing is shown, show a message in the viewer
-        if not self.filtered_rows:
+        if not self.sidebar_model.rowCount():
             self.viewer.setText("No conversations found. Try refreshing the index or check your filters.")
 
+    def _reselect(self, filename):
+        # Select filename once it is in the sidebar (results may still be streaming in)
+        i = self.sidebar_model.find(filename)
+        if i >= 0:
+            self._pending_select = None
+            self.sidebar.setCurrentIndex(self.sidebar_model.index(i))
+            return
+        self._pending_select = filename
+
     def load_selected_convo(self, current, _):
-        idx = self.sidebar.currentRow()
-        if idx < 0 or idx >= len(self.filtered_rows):
+        with metrics.span("viewer.load_selected_convo") as fields:
+            self._show_convo(current)
+            fields["sections"] = len(self._sections)
+            fields["rendered"] = len(self._section_starts)
+
+    def _show_convo(self, current):
+        meta = self.sidebar_model.row_at(current.row()) if current.isValid() else None
+        self._set_hits([])
+        self._set_sections([])
+        self._find_related(meta)
+        if meta is None:
             self.viewer.setText("")
             self.meta_label.setText("Select a conversation to view metadata.")
             return
 
-        meta = self.filtered_rows[idx]
-        filepath = os.path.join(EXPORT_DIR, meta['filename'])
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            if content:
-                html = self.markdown_to_html(content)
-                query = self.last_search_query
-                if query:
-                    # Highlight all occurrences (case-insensitive) in the HTML
-                    def highlight_match(m):
-                        return f"<span style='background-color: yellow; color: black;'>{m.group(0)}</span>"
-                    # Use regex to highlight all matches, even across HTML tags
-                    pattern = re.compile(re.escape(query), re.IGNORECASE)
-                    html = pattern.sub(highlight_match, html)
-                self.viewer.setHtml(html)
-            else:
-                self.viewer.setText("[No content found in this Markdown file.]")
-            self.meta_label.setText(f"Tags & Metadata:\nFile: {meta['filename']} | Words: {meta.get('word_count', '?')}")
-        else:
+        self._shown_key = self._render_key(meta)
+        content = self._read_content(meta)
+        if content is None:
             self.viewer.setText("[Missing .md file]")
             self.meta_label.setText(f"Tags & Metadata:\nFile: {meta['filename']} (missing)")
+            return
+        if content:
+            # Only the first screenful is rendered now; the rest follows on scroll
+            self._set_sections(split_sections(content))
+            self._fill_viewer()
+            self.highlight_hits()
+        else:
+            self.viewer.setText("[No content found in this Markdown file.]")
+        self.meta_label.setText(f"Tags & Metadata:\nFile: {meta['filename']} | Words: {meta.get('word_count', '?')}")
+        self._prefetch_neighbors(current.row())
+
+    def _set_sections(self, sections):
+        self._sections = sections
+        self._section_starts = []
+        self.viewer.clear()
+        self.outline_box.clear()
+        self.outline_box.addItems([f"{i + 1}. {outline_label(s)}" for i, s in enumerate(sections)])
+        self.outline_box.setVisible(len(sections) > 1)
+
+    def _append_section(self):
+        # Render the next section (from the cache if possible) onto the end of the document
+        i = len(self._section_starts)
+        key = (self._shown_key, i) if self._shown_key else None
+        html = self.render_cache.get(key) if key else None
+        if html is None:
+            html = self.markdown_to_html(self._sections[i])
+            if key:
+                self.render_cache.put(key, html)
+        cursor = QTextCursor(self.viewer.document())
+        cursor.movePosition(QTextCursor.End)
+        if i:
+            # Start on a fresh plain block so the section doesn't join a trailing list
+            cursor.insertBlock(QTextBlockFormat(), QTextCharFormat())
+            if cursor.currentList():
+                cursor.currentList().remove(cursor.block())
+        self._section_starts.append(cursor.position())
+        cursor.insertHtml(html)
+
+    def _fill_viewer(self):
+        # Append sections until the view can scroll past the visible area (or all are shown)
+        bar = self.viewer.verticalScrollBar()
+        while len(self._section_starts) < len(self._sections) and bar.value() + bar.pageStep() >= bar.maximum():
+            self._append_section()
+
+    def _on_viewer_scrolled(self, _value):
+        if len(self._section_starts) < len(self._sections):
+            before = len(self._section_starts)
+            self._fill_viewer()
+            if len(self._section_starts) != before and self.last_search_query:
+                self.highlight_hits(goto=False)
+
+    def jump_to_section(self, i):
+        if not 0 <= i < len(self._sections):
+            return
+        while len(self._section_starts) <= i:
+            self._append_section()
+        if self.last_search_query:
+            self.highlight_hits(goto=False)
+        cursor = QTextCursor(self.viewer.document())
+        cursor.setPosition(self._section_starts[i])
+        self.viewer.setTextCursor(cursor)
+        bar = self.viewer.verticalScrollBar()
+        bar.setValue(bar.value() + self.viewer.cursorRect(cursor).top())
+
+    def highlight_hits(self, goto=True):
+        # Highlight the current query as character formats over the document's text
+        # only (never over markup), via extra selections so the document is untouched.
+        # Sections appended later only add hits at the end, so the current hit is kept.
+        plain = self.viewer.toPlainText()
+        hits = find_hits(plain, self.last_search_query)
+        if hits and len(plain.encode('utf-16-le')) != 2 * len(plain):
+            hits = _to_utf16_offsets(plain, hits)
+        hit_index = self._hit_index
+        self._set_hits(hits)
+        if hits and goto:
+            self._goto_hit(0)
+        elif 0 <= hit_index < len(hits):
+            self._hit_index = hit_index
+            self.hit_label.setText(f"{hit_index + 1}/{len(hits)}")
+
+    def _set_hits(self, hits):
+        self._hits = hits
+        self._hit_index = -1
+        fmt = QTextCharFormat()
+        fmt.setBackground(QColor("yellow"))
+        fmt.setForeground(QColor("black"))
+        doc = self.viewer.document()
+        selections = []
+        for start, length in hits:
+            sel = QTextEdit.ExtraSelection()
+            sel.cursor = QTextCursor(doc)
+            sel.cursor.setPosition(start)
+            sel.cursor.setPosition(start + length, QTextCursor.KeepAnchor)
+            sel.format = fmt
+            selections.append(sel)
+        self.viewer.setExtraSelections(selections)
+        self.hit_label.setText(f"{len(hits)} hit(s)" if hits else "")
+
+    def _goto_hit(self, i):
+        if not self._hits:
+            return
+        self._hit_index = i % len(self._hits)
+        start, length = self._hits[self._hit_index]
+        cursor = self.viewer.textCursor()
+        cursor.setPosition(start)
+        cursor.setPosition(start + length, QTextCursor.KeepAnchor)
+        self.viewer.setTextCursor(cursor)
+        self.viewer.ensureCursorVisible()
+        self.hit_label.setText(f"{self._hit_index + 1}/{len(self._hits)}")
+
+    def next_hit(self):
+        # Past the last rendered hit, render further sections until another one turns up
+        if self.last_search_query and self._hit_index + 1 >= len(self._hits):
+            count = len(self._hits)
+            while len(self._section_starts) < len(self._sections) and len(self._hits) == count:
+                self._append_section()
+                self.highlight_hits(goto=False)
+        self._goto_hit(self._hit_index + 1)
+
+    def prev_hit(self):
+        self._goto_hit(self._hit_index - 1)
+
+    def _render_key(self, row):
+        # Changes whenever the rendered source changes, so stale cache entries just age out
+        if self.store:
+            version = self.store.version(row['filename'])
+            return (row['filename'], version) if version else None
+        try:
+            return (row['filename'], os.stat(os.path.join(EXPORT_DIR, row['filename'])).st_mtime_ns)
+        except OSError:
+            return None
+
+    def _prefetch_neighbors(self, current):
+        # Pre-render the rows around the selection so stepping through the list is instant
+        todo = []
+        for i in range(current - PREFETCH_NEIGHBORS, current + PREFETCH_NEIGHBORS + 1):
+            row = self.sidebar_model.row_at(i) if i != current else None
+            key = self._render_key(row) if row else None
+            key = (key, 0) if key else None  # First section only; the rest renders on scroll
+            if key and key not in self.render_cache and key not in self._prefetching:
+                self._prefetching.add(key)
+                todo.append((key, row))
+        if todo:
+            task = _RenderTask(todo, self.store.path if self.store else None)
+            task.signals.rendered.connect(self._on_prefetched)
+            QThreadPool.globalInstance().start(task)
+
+    def _on_prefetched(self, key, html):
+        self._prefetching.discard(key)
+        if html:
+            self.render_cache.put(key, html)
+
+    def _read_content(self, row):
+        # Markdown text for an index row from whichever backend is active; None if missing
+        if self.store:
+            return self.store.read_markdown(row['filename'])
+        filepath = os.path.join(EXPORT_DIR, row['filename'])
+        if not os.path.exists(filepath):
+            return None
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except Exception:
+            return None
+
+    def _set_tags(self, positions, tags_for):
+        # Retag rows in memory, then persist every change with a single write:
+        # one store transaction or one tag-journal record. Returns whether it was saved.
+        rows = [self.index[pos] for pos in positions]
+        old_titles = [row['title'] for row in rows]
+        new_tags = {}
+        for row in rows:
+            tags = tags_for(TAG_RE.findall(row['title']))
+            row['title'] = title_with_tags(row['title'], tags)
+            new_tags[row['filename']] = tags
+        if self.store:
+            if not self._save_store_titles(rows):
+                for row, title in zip(rows, old_titles):
+                    row['title'] = title
+                return False
+        else:
+            self.tag_store.set_tags(new_tags)
+        if self._import_edits is not None:
+            self._import_edits.update(new_tags)
+        self._apply_title_edits(positions)
+        return True
+
+    def _save_store_titles(self, rows):
+        # Another process (e.g. an external parser run) can hold the store's write lock
+        # past the busy timeout; report it instead of failing the GUI
+        try:
+            self.store.save_titles(rows)
+        except sqlite3.OperationalError as e:
+            QMessageBox.warning(self, "Tags Not Saved", f"The conversation store is busy ({e}). Please try again.")
+            return False
+        return True
 
     def markdown_to_html(self, markdown_text):
-        html_body = markdown.markdown(markdown_text)
-        return f"<div style='font-family: Consolas; font-size: 14px;'>{html_body}</div>"
+        return markdown_to_html(markdown_text)
 
     def copy_to_clipboard(self):
         text = self.viewer.toPlainText()
@@ -291,33 +645,147 @@ class FeralCatViewer(QWidget):
         self.viewer.setText("Offline GPT Reader\n\nThis tool helps you rediscover and reuse your GPT convos, offline and organized.")
 
     def run_parser_script(self):
+        if self._import_cancel is not None:
+            QMessageBox.information(self, "Import Running", "An import is already in progress.")
+            return
         file_dialog = QFileDialog(self)
-        file_dialog.setWindowTitle("Select conversations.json")
-        file_dialog.setNameFilter("JSON files (*.json)")
+        file_dialog.setWindowTitle("Select conversations.json or export .zip")
+        file_dialog.setNameFilter("OpenAI export (*.json *.zip)")
         file_dialog.setFileMode(QFileDialog.ExistingFile)
 
         if file_dialog.exec():
             selected_files = file_dialog.selectedFiles()
             convo_path = selected_files[0]
 
-            try:
-                result = subprocess.run(
-                    ['python', 'conversation_parser.py', convo_path],
-                    cwd=os.path.dirname(__file__),  # where the script lives
-                    capture_output=True,
-                    text=True
-                )
-                if result.returncode == 0:
-                    # Clear tags and sidebar before loading new index to prevent ghost tags
-                    self.active_tags.clear()
-                    self.tag_search_box.clear()
-                    self.sidebar.clear()
-                    self.load_index()
-                    self.viewer.setText("✅ Parser ran successfully.\n\n" + result.stdout)
-                else:
-                    self.viewer.setText("❌ Parser failed.\n\n" + result.stderr)
-            except Exception as e:
-                self.viewer.setText(f"⚠️ Error running parser:\n{str(e)}")
+            # Run the parser in-process on a worker thread; the GUI stays live
+            self._import_cancel = threading.Event()
+            self._import_edits = {}
+            task = _ImportTask(convo_path, "sqlite" if self.store else "markdown", self._import_cancel)
+            task.signals.progress.connect(self._on_import_progress)
+            task.signals.finished.connect(self._on_import_finished)
+            task.signals.failed.connect(self._on_import_failed)
+            self.import_progress.setValue(0)
+            self.import_label.setText("Importing...")
+            self.import_bar.setVisible(True)
+            self._long_task_pool.start(task)
+
+    def cancel_import(self):
+        if self._import_cancel is not None:
+            self._import_cancel.set()
+            self.import_label.setText("Cancelling...")
+
+    def _on_import_progress(self, done, bytes_read, total_bytes, eta):
+        self.import_progress.setValue(int(1000 * bytes_read / total_bytes) if total_bytes else 0)
+        eta_text = f", ~{int(eta)}s left" if eta is not None else ""
+        self.import_label.setText(f"Imported {done} conversations ({bytes_read / 1e6:.1f}/{total_bytes / 1e6:.1f} MB{eta_text})")
+
+    def _on_import_finished(self, summary):
+        self._import_cancel = None
+        self.import_bar.setVisible(False)
+        self.tag_store = TagStore()  # The import folded the journal into the CSV
+        rows = summary["rows"]
+        edits, self._import_edits = self._import_edits, None
+        edited = [row for row in rows if row['filename'] in edits]
+        if edited:
+            # The import wrote titles from the index it read at the start; tag edits
+            # made since then are newer, so put them back on top
+            for row in edited:
+                row['title'] = title_with_tags(row['title'], edits[row['filename']])
+            if self.store:
+                self._save_store_titles(edited)
+            else:
+                self.tag_store.set_tags({row['filename']: edits[row['filename']] for row in edited})
+        self._apply_index_delta(rows)
+        QMessageBox.information(
+            self, "Parser Finished",
+            "✅ Parser ran successfully.\n\n"
+            f"{summary['total']} conversations in {summary['elapsed']:.1f}s: "
+            f"{summary['new']} new, {summary['changed']} changed, {summary['skipped']} unchanged."
+        )
+
+    def _on_import_failed(self, message):
+        self._import_cancel = None
+        self._import_edits = None  # Already saved, and the index they apply to is unchanged
+        self.import_bar.setVisible(False)
+        self.viewer.setText(message)
+
+    def _apply_index_delta(self, rows):
+        # Fold fresh index rows (from an import or an external change) into the loaded
+        # index, touching only rows that were added, changed or removed. Returns
+        # whether anything changed.
+        if self.store is None:
+            self.store = ConversationStore.open_existing()
+        rows = [{k: str(v) for k, v in row.items()} for row in rows]
+        by_name = {row['filename']: pos for pos, row in enumerate(self.index)}
+        new_names = {row['filename'] for row in rows}
+        changed = False
+        if not self.index or any(name not in new_names for name in by_name):
+            # Conversations were removed: positions shift, so rebuild the columns in memory
+            changed = rows != self.index
+            if changed:
+                self.index = rows
+                self.filter_index = FilterIndex(self.index)
+        else:
+            for row in rows:
+                pos = by_name.get(row['filename'])
+                if pos is None:
+                    self.index.append(row)
+                    self.filter_index.append_row(row)
+                    changed = True
+                elif self.index[pos] != row:
+                    self.index[pos].update(row)
+                    self.filter_index.update_title(pos, row['title'])
+                    changed = True
+        if changed:
+            selected = self._selected_row()
+            self._restore_scroll = self.sidebar.verticalScrollBar().value()
+            tag_text = self.tag_search_box.currentText()
+            self._refresh_tag_box()
+            if self.active_tags and tag_text in self.filter_index.tags:
+                self.tag_search_box.setCurrentText(tag_text)
+            self.apply_filters()
+            if selected:
+                self._reselect(selected['filename'])
+        return changed
+
+    def setup_watcher(self):
+        # Pick up external parser runs / sync tools without a full reload
+        self._watch_timer = QTimer(self)
+        self._watch_timer.setSingleShot(True)
+        self._watch_timer.setInterval(WATCH_DEBOUNCE_MS)
+        self._watch_timer.timeout.connect(self.refresh_from_disk)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_watched_change)
+        self.watcher.directoryChanged.connect(self._on_watched_change)
+        self._update_watch_paths()
+
+    def _update_watch_paths(self):
+        # Rewrites often replace the file, which drops it from the watcher; re-add each time
+        wanted = [p for p in (os.curdir, EXPORT_DIR, INDEX_CSV, STORE_DB, STORE_DB + "-wal") if os.path.exists(p)]
+        watched = set(self.watcher.files()) | set(self.watcher.directories())
+        missing = [p for p in wanted if p not in watched]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def _on_watched_change(self, _path):
+        self._watch_timer.start()
+
+    def refresh_from_disk(self):
+        self._update_watch_paths()
+        if self._import_cancel is not None:
+            return  # The running import applies its own delta when it finishes
+        if self.store is None:
+            self.store = ConversationStore.open_existing()
+        self.tag_store = TagStore()
+        rows = read_index_rows(self.store, self.tag_store)
+        if rows is None:
+            return
+        self._apply_index_delta(rows)
+        # Re-render the open conversation if its source changed underneath us
+        current = self.sidebar.currentIndex()
+        meta = self._selected_row()
+        if meta is not None and self._render_key(meta) != self._shown_key:
+            self.load_selected_convo(current, None)
 
     def _on_tag_activated(self, index):
         if index == 0:
@@ -333,39 +801,28 @@ class FeralCatViewer(QWidget):
         self.apply_filters()
 
     def save_tags_for_selected(self):
-        idx = self.sidebar.currentRow()
-        if idx < 0 or idx >= len(self.filtered_rows):
+        pos = self._selected_position()
+        if pos < 0:
             return
-        meta = self.filtered_rows[idx]
+        meta = self.index[pos]
         # Get new tags from the editor
-        new_tags = [t.strip() for t in self.tag_edit_box.text().split(",") if t.strip()]
-        # Remove old tags from title, add new ones
-        title_wo_tags = re.sub(r'#\w+', '', meta['title']).strip()
-        if new_tags:
-            meta['title'] = f"{title_wo_tags} " + " ".join(f"#{t}" for t in new_tags)
-        else:
-            meta['title'] = title_wo_tags
-        # Save changes back to CSV
-        self._save_index_to_csv()
-        self.load_index()
-        self.sidebar.setCurrentRow(idx)
+        new_tags = _parse_tags(self.tag_edit_box.text())
+        # Replace the row's tags and save them
+        if not self._set_tags([pos], lambda _old: new_tags):
+            return
+        self._reselect(meta['filename'])
         # Show popup and clear tag box
         QMessageBox.information(self, "Tags Updated", f"{len(new_tags)} tag(s) added.")
         self.tag_edit_box.clear()
 
     def remove_tags_for_selected(self):
-        idx = self.sidebar.currentRow()
-        if idx < 0:
+        pos = self._selected_position()
+        if pos < 0:
             QMessageBox.information(self, "No Selection", "Please select a conversation before removing tags.")
             return
-        # Find the filtered index as in load_selected_convo
-        filtered_index = [row for row in self.index if not self.active_tags or self.active_tags.issubset(set(re.findall(r'#(\w+)', row['title'])))]
-        filtered_index = [row for row in filtered_index if self.search_box.text().strip().lower() in f"{row['date']} - {row['title']}".lower()]
-        if idx >= len(filtered_index):
-            return
-        meta = filtered_index[idx]
+        meta = self.index[pos]
         # Get current tags
-        tags_in_title = re.findall(r'#(\w+)', meta['title'])
+        tags_in_title = TAG_RE.findall(meta['title'])
         if not tags_in_title:
             QMessageBox.information(self, "Remove Tags", "No tags to remove for this conversation.")
             return
@@ -373,37 +830,50 @@ class FeralCatViewer(QWidget):
         tag_str = ", ".join(tags_in_title)
         new_tag_str, ok = QInputDialog.getText(self, "Remove Tags", "Edit tags (comma-separated):", text=tag_str)
         if ok:
-            new_tags = [t.strip() for t in new_tag_str.split(",") if t.strip()]
-            # Remove old tags from title, add new ones
-            title_wo_tags = re.sub(r'#\w+', '', meta['title']).strip()
+            new_tags = _parse_tags(new_tag_str)
             if new_tags:
-                meta['title'] = f"{title_wo_tags} " + " ".join(f"#{t}" for t in new_tags)
                 msg = f"Tags updated to: {', '.join(new_tags)}"
             else:
-                meta['title'] = title_wo_tags
                 msg = "All tags removed."
-            # Save changes back to CSV
-            self._save_index_to_csv()
-            self.load_index()
-            self.sidebar.setCurrentRow(idx)
+            # Replace the row's tags and save them
+            if not self._set_tags([pos], lambda _old: new_tags):
+                return
+            self._reselect(meta['filename'])
             QMessageBox.information(self, "Tags Updated", msg)
             self.tag_edit_box.clear()
 
+    def tag_filtered(self):
+        """Add tags to every conversation in the current filtered list, in one write."""
+        self._bulk_tag("Tag All Filtered", "Tags to add to {n} conversation(s):",
+                       lambda old, tags: old + [t for t in tags if t not in old])
+
+    def untag_filtered(self):
+        """Remove tags from every conversation in the current filtered list, in one write."""
+        self._bulk_tag("Untag All Filtered", "Tags to remove from {n} conversation(s):",
+                       lambda old, tags: [t for t in old if t not in tags])
+
+    def _bulk_tag(self, title, prompt, combine):
+        positions = self.sidebar_model.visible_positions()
+        if not positions:
+            QMessageBox.information(self, "No Conversations", "No conversations in the current filter.")
+            return
+        tag_str, ok = QInputDialog.getText(self, title, prompt.format(n=len(positions)))
+        tags = _parse_tags(tag_str) if ok else []
+        if not tags:
+            return
+        selected = self._selected_row()
+        if not self._set_tags(positions, lambda old: combine(old, tags)):
+            return
+        if selected:
+            self._reselect(selected['filename'])
+        QMessageBox.information(self, "Tags Updated", f"Updated tags on {len(positions)} conversation(s).")
+
     def save_index(self):
         with open(INDEX_CSV, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=self.index[0].keys())
             writer.writeheader()
             writer.writerows(self.index)
 
-    def _save_index_to_csv(self):
-        with open(INDEX_CSV, "w", encoding="utf-8", newline="") as csvfile:
-            if not self.index:
-                return
-            writer = csv.DictWriter(csvfile, fieldnames=self.index[0].keys())
-            writer.writeheader()
-            for row in self.index:
-                writer.writerow(row)
-
     def toggle_dark_mode(self):
         app = QApplication.instance()
         # Check if dark mode is currently enabled by checking the config file
@@ -444,7 +914,7 @@ class FeralCatViewer(QWidget):
                 background-color: #232629;
                 color: #f0f0f0;
             }
-            QLineEdit, QTextEdit, QTextBrowser, QComboBox, QListWidget, QDateEdit {
+            QLineEdit, QTextEdit, QTextBrowser, QComboBox, QListView, QDateEdit {
                 background-color: #2b2b2b;
                 color: #f0f0f0;
                 border: 1px solid #444;
@@ -515,23 +985,410 @@ class FeralCatViewer(QWidget):
         if not self.filtered_rows:
             QMessageBox.information(self, "No Conversations", "No conversations to copy for this tag.")
             return
-        all_content = []
-        for row in self.filtered_rows:
-            filepath = os.path.join(EXPORT_DIR, row['filename'])
-            if os.path.exists(filepath):
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read().strip()
-                        # Optionally add a separator and title for clarity
-                        all_content.append(f"## {row['date']} - {row['title']}\n\n{content}")
-                except Exception:
-                    continue
-        if all_content:
-            QApplication.clipboard().setText("\n\n---\n\n".join(all_content))
+        # Capped so a broad tag can't build a huge string on the GUI thread
+        text, count = collect_for_clipboard(self.filtered_rows, self._read_content)
+        if text is None:
+            answer = QMessageBox.question(
+                self, "Too Large for Clipboard",
+                "The filtered conversations are too large to copy to the clipboard.\n\nExport them to a file instead?")
+            if answer == QMessageBox.Yes:
+                self.export_filtered()
+        elif count:
+            QApplication.clipboard().setText(text)
             QMessageBox.information(self, "Tag Conversations Copied", "Tag Conversations Copied")
         else:
             QMessageBox.information(self, "No Content", "No content found for the filtered conversations.")
 
+    def _find_related(self, row):
+        # Fill the related box for row off the GUI thread; hidden until results arrive
+        self.related_box.clear()
+        self.related_box.setVisible(False)
+        self._related_for = row['filename'] if row else None
+        if row and os.path.exists(SEARCH_DB):
+            task = _NearDuplicateTask(row['filename'])
+            task.signals.found.connect(self._on_related_found)
+            QThreadPool.globalInstance().start(task)
+
+    def _on_related_found(self, filename, related):
+        if filename != self._related_for or not related:
+            return
+        by_name = {row['filename']: row for row in self.index}
+        self.related_box.addItem(f"Related ({len(related)})...", None)
+        for other, similarity in related:
+            row = by_name.get(other)
+            if row:
+                self.related_box.addItem(f"{row_label(row)} ({similarity:.0%})", other)
+        self.related_box.setVisible(self.related_box.count() > 1)
+
+    def open_related(self, i):
+        filename = self.related_box.itemData(i)
+        self.related_box.setCurrentIndex(0)
+        if filename:
+            self._select_anywhere(filename)
+
+    def _select_anywhere(self, filename):
+        # Select filename, clearing the filters first if they hide it
+        if self.sidebar_model.find(filename) < 0:
+            self.search_box.blockSignals(True)  # No debounced search to undo the reselect
+            self.search_box.clear()
+            self.search_box.blockSignals(False)
+            self.active_tags.clear()
+            self.tag_search_box.setCurrentIndex(-1)
+            self.date_range = (None, None)
+            self.apply_filters()
+        self._reselect(filename)
+
+    def show_near_duplicates(self):
+        """List every group of near-duplicate conversations together in the sidebar."""
+        if not os.path.exists(SEARCH_DB):
+            QMessageBox.information(self, "No Search Index", "Run the parser first to build the search index.")
+            return
+        task = _NearDuplicateTask(None)
+        task.signals.found.connect(self._on_near_duplicates_found)
+        QThreadPool.globalInstance().start(task)
+
+    def _on_near_duplicates_found(self, _, clusters):
+        position_of = {row['filename']: pos for pos, row in enumerate(self.index)}
+        positions = [position_of[f] for cluster in clusters for f in cluster if f in position_of]
+        if not positions:
+            QMessageBox.information(self, "Near-Duplicates", "No near-duplicate conversations found.")
+            return
+        # Takes the place of the current results until a filter changes
+        if self._search_cancel is not None:
+            self._search_cancel.set()
+        self._search_generation += 1
+        self.sidebar_model.set_source(self.index)
+        self.sidebar_model.extend_mask(positions)
+        self.viewer.setText(f"{len(clusters)} groups of near-duplicate conversations ({len(positions)} in all) "
+                            "are listed together in the sidebar. Change a filter to return to the full list.")
+
+    def toggle_profiling(self, enabled):
+        """Start or stop cProfile on the GUI thread; stopping writes the stats file."""
+        if enabled:
+            metrics.start_profiling()
+            return
+        path = metrics.stop_profiling()
+        metrics.flush()
+        if path:
+            QMessageBox.information(
+                self, "Profile Saved",
+                f"Profile written to {os.path.abspath(path)}\n\nOpen it with: python -m pstats {path}\n"
+                f"Timings are logged to {os.path.abspath(metrics.METRICS_LOG)}")
+
+    def export_filtered(self):
+        """Stream the filtered conversations to one Markdown, JSONL or zip file on a worker thread."""
+        if self._export_cancel is not None:
+            QMessageBox.information(self, "Export Running", "An export is already in progress.")
+            return
+        rows = self.filtered_rows
+        if not rows:
+            QMessageBox.information(self, "No Conversations", "No conversations to export.")
+            return
+        dest_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Filtered Conversations", "", ";;".join(EXPORT_FORMATS.values()))
+        if not dest_path:
+            return
+        fmt = next((f for f, name in EXPORT_FORMATS.items() if name == selected_filter), "md")
+        ext = os.path.splitext(dest_path)[1].lstrip('.').lower()
+        if ext in EXPORT_FORMATS:
+            fmt = ext
+        else:
+            dest_path += f".{fmt}"
+
+        self._export_cancel = threading.Event()
+        task = _ExportTask(rows, dest_path, fmt, self.store.path if self.store else None, self._export_cancel)
+        task.signals.progress.connect(self._on_export_progress)
+        task.signals.finished.connect(self._on_export_finished)
+        task.signals.failed.connect(self._on_export_failed)
+        self.export_progress.setRange(0, len(rows))
+        self.export_progress.setValue(0)
+        self.export_label.setText("Exporting...")
+        self.export_bar.setVisible(True)
+        self._long_task_pool.start(task)
+
+    def cancel_export(self):
+        if self._export_cancel is not None:
+            self._export_cancel.set()
+            self.export_label.setText("Cancelling...")
+
+    def _on_export_progress(self, done, total):
+        self.export_progress.setValue(done)
+        self.export_label.setText(f"Exported {done}/{total} conversations")
+
+    def _on_export_finished(self, written, dest_path):
+        self._export_cancel = None
+        self.export_bar.setVisible(False)
+        QMessageBox.information(self, "Exported", f"{written} conversation(s) exported to {dest_path}.")
+
+    def _on_export_failed(self, message):
+        self._export_cancel = None
+        self.export_bar.setVisible(False)
+        QMessageBox.warning(self, "Export", message)
+
+    def export_filtered_markdown(self):
+        """Write the filtered conversations from the SQLite store out as Markdown files."""
+        if not self.store:
+            QMessageBox.information(self, "Export to Markdown", f"Conversations are already stored as Markdown in {EXPORT_DIR}.")
+            return
+        if not self.filtered_rows:
+            QMessageBox.information(self, "No Conversations", "No conversations to export.")
+            return
+        dest_dir = QFileDialog.getExistingDirectory(self, "Export Markdown to...")
+        if not dest_dir:
+            return
+        written = self.store.export_markdown([row['filename'] for row in self.filtered_rows], dest_dir)
+        QMessageBox.information(self, "Exported", f"{written} conversation(s) exported to {dest_dir}.")
+
+
+def _parse_tags(text):
+    # "a, #b , c" -> ['a', 'b', 'c']
+    return [t.strip().lstrip('#') for t in text.split(",") if t.strip().lstrip('#')]
+
+
+def _to_utf16_offsets(text, hits):
+    # Qt positions count UTF-16 code units; Python offsets count code points
+    out = []
+    units = 0
+    pos = 0
+    for start, length in hits:
+        units += len(text[pos:start].encode('utf-16-le')) // 2
+        span = len(text[start:start + length].encode('utf-16-le')) // 2
+        out.append((units, span))
+        units += span
+        pos = start + length
+    return out
+
+
+class _ImportSignals(QObject):
+    progress = Signal(int, float, float, object)
+    finished = Signal(object)
+    failed = Signal(str)
+
+
+class _ImportTask(QRunnable):
+    """Runs conversation_parser.run_import off the GUI thread."""
+
+    def __init__(self, path, store_backend, cancel):
+        super().__init__()
+        self.signals = _ImportSignals()
+        self.path = path
+        self.store_backend = store_backend
+        self.cancel = cancel
+
+    def run(self):
+        # Imported here so the parser's dependencies don't slow down viewer startup
+        from conversation_parser import ImportCancelled, run_import
+        try:
+            summary = run_import(self.path, store_backend=self.store_backend,
+                                 progress=self.signals.progress.emit, should_stop=self.cancel.is_set)
+        except ImportCancelled as e:
+            self.signals.failed.emit(f"⚠️ {e}. The index was left unchanged.")
+        except Exception as e:
+            self.signals.failed.emit(f"❌ Parser failed.\n\n{e}")
+        else:
+            self.signals.finished.emit(summary)
+
+
+class _ExportSignals(QObject):
+    progress = Signal(int, int)
+    finished = Signal(int, str)
+    failed = Signal(str)
+
+
+class _ExportTask(QRunnable):
+    """Runs bulk_export.export_conversations off the GUI thread."""
+
+    def __init__(self, rows, dest_path, fmt, store_path, cancel):
+        super().__init__()
+        self.signals = _ExportSignals()
+        self.rows = rows
+        self.dest_path = dest_path
+        self.fmt = fmt
+        self.store_path = store_path
+        self.cancel = cancel
+        self._last_progress = 0.0
+
+    def _progress(self, done, total):
+        # Throttled so a large export doesn't flood the GUI thread with updates
+        now = time.monotonic()
+        if done == total or now - self._last_progress >= EXPORT_PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.signals.progress.emit(done, total)
+
+    def run(self):
+        store = ConversationStore(self.store_path) if self.store_path else None
+        if store:
+            read_content = lambda row: store.read_markdown(row['filename'])
+        else:
+            read_content = lambda row: read_markdown_file(row['filename'])
+        try:
+            written = export_conversations(self.rows, self.dest_path, self.fmt, read_content,
+                                           progress=self._progress, should_stop=self.cancel.is_set)
+        except ExportCancelled:
+            self.signals.failed.emit("⚠️ Export cancelled. No file was written.")
+        except Exception as e:
+            self.signals.failed.emit(f"❌ Export failed.\n\n{e}")
+        else:
+            self.signals.finished.emit(written, self.dest_path)
+        finally:
+            if store:
+                store.close()
+
+
+class ConversationListModel(QAbstractListModel):
+    """Sidebar model over the loaded index; filtering only swaps the visible-position mask."""
+
+    FilenameRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._mask = []
+
+    def set_source(self, rows):
+        # New index (or new search): start with nothing visible
+        self.beginResetModel()
+        self._rows = rows
+        self._mask = []
+        self.endResetModel()
+
+    def extend_mask(self, positions):
+        if not positions:
+            return
+        first = len(self._mask)
+        self.beginInsertRows(QModelIndex(), first, first + len(positions) - 1)
+        self._mask.extend(positions)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._mask)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = self.row_at(index.row()) if index.isValid() else None
+        if row is None:
+            return None
+        if role == Qt.DisplayRole:
+            return row_label(row)
+        if role == self.FilenameRole:
+            return row['filename']
+        return None
+
+    def row_at(self, i):
+        return self._rows[self._mask[i]] if 0 <= i < len(self._mask) else None
+
+    def position_at(self, i):
+        return self._mask[i] if 0 <= i < len(self._mask) else -1
+
+    def visible_rows(self):
+        return [self._rows[pos] for pos in self._mask]
+
+    def visible_positions(self):
+        return list(self._mask)
+
+    def find(self, filename):
+        for i, pos in enumerate(self._mask):
+            if self._rows[pos]['filename'] == filename:
+                return i
+        return -1
+
+
+class _SearchSignals(QObject):
+    batch = Signal(int, object)
+    finished = Signal(int)
+
+
+class _SearchTask(QRunnable):
+    """Runs one filter/search pass off the GUI thread, streaming matches in batches."""
+
+    BATCH_SIZE = 200
+
+    def __init__(self, generation, cancel, rows, query, positions, store_path, ranked=False):
+        super().__init__()
+        self.signals = _SearchSignals()
+        self.generation = generation
+        self.cancel = cancel
+        self.rows = rows
+        self.query = query
+        self.positions = positions  # FilterIndex candidates, None for every row
+        self.store_path = store_path
+        self.ranked = ranked  # Best BM25 matches first instead of index order
+
+    def run(self):
+        # SQLite connections can't cross threads, so each task opens its own
+        search_index = SearchIndex.open_existing() if self.query else None
+        store = ConversationStore(self.store_path) if (self.query and self.store_path) else None
+        try:
+            batch = []
+            for pos, _ in search_positions(self.rows, self.query, self.positions, search_index, store,
+                                           ranked=self.ranked, should_stop=self.cancel.is_set):
+                batch.append(pos)
+                if len(batch) >= self.BATCH_SIZE:
+                    self.signals.batch.emit(self.generation, batch)
+                    batch = []
+            if not self.cancel.is_set():
+                if batch:
+                    self.signals.batch.emit(self.generation, batch)
+                self.signals.finished.emit(self.generation)
+        finally:
+            if search_index:
+                search_index.close()
+            if store:
+                store.close()
+
+
+class _NearDuplicateSignals(QObject):
+    found = Signal(object, object)
+
+
+class _NearDuplicateTask(QRunnable):
+    """Looks up the conversations related to filename, or with None every near-duplicate group."""
+
+    def __init__(self, filename):
+        super().__init__()
+        self.signals = _NearDuplicateSignals()
+        self.filename = filename
+
+    def run(self):
+        search_index = SearchIndex.open_existing()
+        if search_index is None:
+            return
+        try:
+            if self.filename is None:
+                result = search_index.near_duplicate_clusters()
+            else:
+                result = search_index.related(self.filename)
+        finally:
+            search_index.close()
+        self.signals.found.emit(self.filename, result)
+
+
+class _RenderSignals(QObject):
+    rendered = Signal(object, str)
+
+
+class _RenderTask(QRunnable):
+    """Renders the first section of conversations ahead of time for the viewer's RenderCache."""
+
+    def __init__(self, items, store_path):
+        super().__init__()
+        self.signals = _RenderSignals()
+        self.items = items
+        self.store_path = store_path
+
+    def run(self):
+        store = ConversationStore(self.store_path) if self.store_path else None
+        try:
+            for key, row in self.items:
+                if store:
+                    content = store.read_markdown(row['filename'])
+                else:
+                    content = read_markdown_file(row['filename'])
+                sections = split_sections(content) if content else []
+                self.signals.rendered.emit(key, markdown_to_html(sections[0]) if sections else "")
+        finally:
+            if store:
+                store.close()
+
 if __name__ == "__main__":
     import sys
     app = QApplication(sys.argv)
@@ -0,0 +1,83 @@
+import atexit
+import cProfile
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_LOG = "feralcat_metrics.jsonl"
+PROFILE_PATH = "feralcat_profile.prof"
+
+# Records held in memory before being appended to the metrics log in one write
+FLUSH_EVERY = 200
+
+_buffer = []
+_lock = threading.Lock()
+_profiler = None
+
+
+def record(name, seconds, **fields):
+    # One JSON line: {"ts": ..., "span": name, "ms": ..., **fields}
+    entry = {"ts": round(time.time(), 3), "span": name, "ms": round(seconds * 1000, 3)}
+    entry.update(fields)
+    with _lock:
+        _buffer.append(entry)
+        if len(_buffer) >= FLUSH_EVERY:
+            _flush_locked()
+
+
+@contextmanager
+def span(name, **fields):
+    """Time the with-block and record it under name.
+
+    Yields the fields dict, so the block can add details (row counts etc.)
+    that are only known once it has run.
+    """
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        record(name, time.perf_counter() - start, **fields)
+
+
+def flush():
+    with _lock:
+        _flush_locked()
+
+
+def _flush_locked():
+    if not _buffer:
+        return
+    try:
+        with open(METRICS_LOG, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in _buffer))
+    except OSError:
+        pass  # Metrics are best-effort; never break the app over them
+    _buffer.clear()
+
+
+atexit.register(flush)
+
+
+# --- cProfile hook (profiles the thread that starts it, e.g. the GUI thread) ---
+
+def profiling():
+    return _profiler is not None
+
+
+def start_profiling():
+    global _profiler
+    if _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def stop_profiling(path=PROFILE_PATH):
+    # Stop and write the stats (readable with `python -m pstats`); returns the path
+    global _profiler
+    if _profiler is None:
+        return None
+    _profiler.disable()
+    _profiler.dump_stats(path)
+    _profiler = None
+    return path
@@ -0,0 +1,80 @@
+import hashlib
+import zlib
+from operator import eq
+
+# MinHash signature length, and the LSH bands it is cut into (NUM_PERM // LSH_BANDS values each).
+# With 4-value bands, pairs above ~0.5 similarity almost always share a bucket.
+NUM_PERM = 128
+LSH_BANDS = 32
+BAND_SIZE = NUM_PERM // LSH_BANDS
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Estimated similarity (shared shingles / all shingles) for a near-duplicate...
+DUPLICATE_SIMILARITY = 0.8
+# ...and for a "related conversation"
+RELATED_SIMILARITY = 0.3
+RELATED_K = 10
+
+# Shingles hashed per numpy pass, to bound the NUM_PERM x chunk temporary
+SIGNATURE_CHUNK = 4096
+
+
+def _hash_params():
+    # Fixed per-permutation (a, b) for multiply-add-shift hashing; derived from
+    # their index so signatures stay comparable across runs and machines
+    params = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"feralcat-minhash-{i}".encode(), digest_size=16).digest()
+        params.append((int.from_bytes(digest[:8], "little") | 1, int.from_bytes(digest[8:], "little")))
+    return params
+
+
+_PARAMS = _hash_params()
+_arrays = None  # (a, b) as numpy column vectors, built on first use
+
+
+def signature(tokens):
+    """MinHash signature of tokens' word shingles as NUM_PERM little-endian uint32s.
+
+    Returns None for an empty token list. Needs numpy (imported here so the
+    parser only pays for it when signatures are computed).
+    """
+    import numpy as np
+
+    global _arrays
+    if not tokens:
+        return None
+    token_hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+    width = min(SHINGLE_SIZE, len(tokens))
+    shingles = token_hashes[:len(tokens) - width + 1].copy()
+    for i in range(1, width):
+        shingles = shingles * np.uint64(0x9E3779B97F4A7C15) + token_hashes[i:len(tokens) - width + 1 + i]
+    shingles = np.unique((shingles ^ (shingles >> np.uint64(32))) & np.uint64(0xFFFFFFFF))
+
+    if _arrays is None:
+        _arrays = tuple(np.array(column, dtype=np.uint64)[:, None] for column in zip(*_PARAMS))
+    a, b = _arrays
+    mins = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    buf = np.empty((NUM_PERM, min(len(shingles), SIGNATURE_CHUNK)), dtype=np.uint64)
+    for start in range(0, len(shingles), SIGNATURE_CHUNK):
+        chunk = shingles[None, start:start + SIGNATURE_CHUNK]
+        out = buf[:, :chunk.shape[1]]
+        # (a * x + b) mod 2**64, one hash function per row, computed in place
+        np.multiply(a, chunk, out=out)
+        out += b
+        np.minimum(mins, out.min(axis=1), out=mins)
+    # The top 32 bits are the hash; shifting after the min gives the same result
+    return (mins >> np.uint64(32)).astype("<u4").tobytes()
+
+
+def bands(sig):
+    # The LSH bucket keys of a signature, one per band
+    step = BAND_SIZE * 4
+    return [sig[i:i + step] for i in range(0, len(sig), step)]
+
+
+def similarity(sig_a, sig_b):
+    # Estimated Jaccard similarity: the share of positions where the signatures agree
+    return sum(map(eq, memoryview(sig_a).cast("I"), memoryview(sig_b).cast("I"))) / NUM_PERM
@@ -0,0 +1,142 @@
+import re
+from collections import OrderedDict
+
+# Default budget for cached HTML, counted in characters of rendered output
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Characters of Markdown rendered at a time when a conversation is shown in sections
+SECTION_CHARS = 16 * 1024
+
+OUTLINE_LABEL_CHARS = 60
+
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+
+
+def markdown_to_html(markdown_text):
+    # Imported on first render rather than at startup
+    import markdown
+    html_body = markdown.markdown(markdown_text)
+    return f"<div style='font-family: Consolas; font-size: 14px;'>{html_body}</div>"
+
+
+def _blocks(text):
+    # Top-level Markdown blocks: runs of lines split on blank lines outside fenced code
+    block = []
+    fence = None
+    for line in text.split("\n"):
+        m = FENCE_RE.match(line)
+        if m:
+            if fence is None:
+                fence = m.group(1)
+            elif m.group(1) == fence:
+                fence = None
+        if fence is None and not line.strip():
+            if block:
+                yield "\n".join(block)
+                block = []
+            continue
+        block.append(line)
+    if block:
+        yield "\n".join(block)
+
+
+def _split_block(block, max_chars):
+    # Cut one oversized block at line boundaries, re-fencing the pieces of a code block
+    lines = block.split("\n")
+    m = FENCE_RE.match(lines[0])
+    opener = closer = None
+    if m and len(lines) > 1:
+        opener = lines.pop(0)
+        closer = m.group(1)
+        if FENCE_RE.match(lines[-1]):
+            lines.pop()
+    pieces = []
+    piece = []
+    size = 0
+    for line in lines:
+        if piece and size + len(line) > max_chars:
+            pieces.append(piece)
+            piece, size = [], 0
+        piece.append(line)
+        size += len(line) + 1
+    if piece:
+        pieces.append(piece)
+    if opener is None:
+        return ["\n".join(p) for p in pieces]
+    return ["\n".join([opener] + p + [closer]) for p in pieces]
+
+
+def split_sections(text, max_chars=SECTION_CHARS):
+    """Split Markdown into sections of whole top-level blocks, about max_chars each.
+
+    Sections can be rendered independently and shown one after another. A
+    block bigger than max_chars on its own (e.g. a huge code dump) is cut at
+    line boundaries.
+    """
+    sections = []
+    current = []
+    size = 0
+    for block in _blocks(text):
+        if len(block) > max_chars:
+            if current:
+                sections.append("\n\n".join(current))
+                current, size = [], 0
+            sections.extend(_split_block(block, max_chars))
+            continue
+        if current and size + len(block) > max_chars:
+            sections.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(block)
+        size += len(block) + 2
+    if current:
+        sections.append("\n\n".join(current))
+    return sections
+
+
+def outline_label(section):
+    # Short plain label for a section: its first line without Markdown markers
+    for line in section.split("\n"):
+        label = line.strip().lstrip("#>*-`~ ").strip()
+        if label:
+            return label if len(label) <= OUTLINE_LABEL_CHARS else label[:OUTLINE_LABEL_CHARS - 1] + "…"
+    return ""
+
+
+class RenderCache:
+    """Byte-bounded LRU of rendered conversation HTML.
+
+    Keys should change whenever the source changes (e.g. filename + mtime), so
+    stale entries simply age out instead of needing explicit invalidation.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        html = self._entries.get(key)
+        if html is not None:
+            self._entries.move_to_end(key)
+        return html
+
+    def put(self, key, html):
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key))
+        if len(html) > self.max_bytes:
+            return  # Would evict everything else for a single page
+        self._entries[key] = html
+        self.size += len(html)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
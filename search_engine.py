@@ -0,0 +1,147 @@
+import os
+import re
+from itertools import islice
+
+from search_index import RANK_TOP_K
+from tag_store import TAG_RE
+
+EXPORT_DIR = 'markdown_exports'
+
+TOKEN_SPLIT_RE = re.compile(r'\w+')
+# Characters the inverted index can't see (c++, c#, .net, foo-bar)
+UNINDEXED_RE = re.compile(r'[^\w\s]')
+
+
+def row_tags(row):
+    return set(TAG_RE.findall(row.get('title', '')))
+
+
+def row_label(row):
+    return f"{row['date']} - {row['title']}"
+
+
+def read_markdown_file(filename, export_dir=EXPORT_DIR):
+    filepath = os.path.join(export_dir, filename)
+    if not os.path.exists(filepath):
+        return None
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except Exception:
+        return None
+
+
+def lookup_content_hits(query, search_index=None, store=None):
+    # Filenames whose content matches query, answered in one shot by the inverted
+    # index or the SQLite store; None means the caller has to scan content itself
+    if not query:
+        return None
+    hits = search_index.search(query) if search_index else None
+    if hits is not None and UNINDEXED_RE.search(query):
+        # The index only saw the words, so "c++" came back as every document with a
+        # word starting with "c"; keep the ones that really contain the query
+        if store:
+            return store.search_content(query)
+        return {filename for filename in hits
+                if query in (read_markdown_file(filename) or '').lower()}
+    if hits is None and store:
+        hits = store.search_content(query)
+    return hits
+
+
+def find_hits(text, query):
+    """(start, length) offsets of query in text, case-insensitive.
+
+    Falls back to the individual words when the whole query doesn't occur,
+    matching how the inverted index treats multi-word queries.
+    """
+    if not query:
+        return []
+    haystack = text.lower()
+    needles = [query.lower()]
+    hits = _find_all(haystack, needles[0])
+    if not hits:
+        needles = sorted(set(TOKEN_SPLIT_RE.findall(needles[0])), key=len, reverse=True)
+        hits = []
+        for start, length in sorted(h for needle in needles for h in _find_all(haystack, needle)):
+            # Drop overlaps (e.g. "py" inside "python") so ranges stay ordered and disjoint
+            if not hits or start >= hits[-1][0] + hits[-1][1]:
+                hits.append((start, length))
+    return hits
+
+
+def _find_all(haystack, needle):
+    hits = []
+    if not needle:
+        return hits
+    start = haystack.find(needle)
+    while start >= 0:
+        hits.append((start, len(needle)))
+        start = haystack.find(needle, start + len(needle))
+    return hits
+
+
+def iter_match_positions(rows, query='', active_tags=(), date_range=(None, None),
+                         content_hits=None, read_content=None, should_stop=None, positions=None):
+    """Yield the positions of rows that pass the tag, date and search filters, in order.
+
+    query must already be lowercased; date_range holds 'yyyy-MM-dd' strings and
+    only applies when both ends are set. Content matches come from content_hits
+    when available, otherwise read_content(row) is scanned. Stops early once
+    should_stop() returns True.
+
+    positions, when given (e.g. from FilterIndex.candidates), restricts the scan
+    to those rows and replaces the per-row tag and date checks.
+    """
+    if positions is not None:
+        active_tags, date_range = (), (None, None)
+    else:
+        positions = range(len(rows))
+    active_tags = set(active_tags)
+    start, end = date_range
+    for pos in positions:
+        row = rows[pos]
+        if should_stop and should_stop():
+            return
+        if active_tags and not active_tags.issubset(row_tags(row)):
+            continue
+        date_str = row.get('date', '')
+        if start and end and date_str and not (start <= date_str <= end):
+            continue
+        if not query or query in row_label(row).lower():
+            yield pos
+            continue
+        if content_hits is not None:
+            if row['filename'] in content_hits:
+                yield pos
+        elif read_content:
+            content = read_content(row)
+            if content and query in content.lower():
+                yield pos
+
+
+def search_positions(rows, query='', positions=None, search_index=None, store=None, ranked=False,
+                     limit=None, should_stop=None):
+    """Yield (position, score) for the rows matching query, as the viewer lists them.
+
+    positions are FilterIndex candidates (None for every row) and query must
+    already be lowercased. With ranked and a search index the best BM25 matches
+    come first, at most limit (default RANK_TOP_K); otherwise rows come in index
+    order with a score of None. Ranked mode falls back to that when the query
+    has no indexable words.
+    """
+    if ranked and search_index and query:
+        filenames = None if positions is None else [rows[pos]['filename'] for pos in positions]
+        ranked_hits = search_index.rank(query, limit or RANK_TOP_K, filenames=filenames)
+        if ranked_hits is not None:
+            position_of = {row['filename']: pos for pos, row in enumerate(rows)}
+            for filename, score in ranked_hits:
+                if filename in position_of:
+                    yield position_of[filename], score
+            return
+    content_hits = lookup_content_hits(query, search_index, store)
+    matches = iter_match_positions(rows, query, content_hits=content_hits,
+                                   read_content=lambda r: read_markdown_file(r['filename']),
+                                   should_stop=should_stop, positions=positions)
+    for pos in islice(matches, limit):
+        yield pos, None
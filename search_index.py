@@ -0,0 +1,404 @@
+import heapq
+import math
+import os
+import re
+import sqlite3
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+
+from near_duplicates import DUPLICATE_SIMILARITY, RELATED_K, RELATED_SIMILARITY, bands, similarity
+
+SEARCH_DB = "feralcat_search.db"
+
+TOKEN_RE = re.compile(r"\w+")
+PHRASE_RE = re.compile(r'"([^"]*)"')
+
+# BM25 parameters: term-frequency saturation and document-length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Occurrences in the title count this many times over
+TITLE_BOOST = 3
+# Ranked results returned by SearchIndex.rank
+RANK_TOP_K = 200
+
+# Stored as PRAGMA user_version; bump when documents need re-tokenizing (2: title_tf, 3: MinHash)
+INDEX_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id       INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL UNIQUE,
+    length   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    token     TEXT NOT NULL,
+    doc_id    INTEGER NOT NULL,
+    positions BLOB NOT NULL,
+    title_tf  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (token, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_doc ON postings(doc_id);
+CREATE TABLE IF NOT EXISTS df (
+    token TEXT PRIMARY KEY,
+    n     INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS auto_tags (
+    doc_id INTEGER PRIMARY KEY,
+    tags   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS minhash (
+    doc_id    INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh (
+    band   INTEGER NOT NULL,
+    bucket BLOB NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lsh_by_doc ON lsh(doc_id);
+"""
+
+# Bytes per stored token position (array('I'))
+POSITION_SIZE = array("I").itemsize
+
+# Values bound per "IN (...)" list, under SQLite's bound-parameter limit
+IN_CHUNK = 900
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def build_postings(tokens):
+    # token -> list of token positions, plus the document length in tokens
+    postings = {}
+    for n, token in enumerate(tokens):
+        postings.setdefault(token, []).append(n)
+    return postings, len(tokens)
+
+
+def parse_query(query):
+    # ([loose terms], [[phrase terms], ...]) from a query with optional "quoted phrases"
+    phrases = [tokens for tokens in (tokenize(p) for p in PHRASE_RE.findall(query)) if tokens]
+    return tokenize(PHRASE_RE.sub(" ", query)), phrases
+
+
+def _prefix_bounds(prefix):
+    # [prefix, upper) covers every token starting with prefix in an index scan
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SearchIndex:
+    """Inverted index over conversation text: token -> (conversation, positions)."""
+
+    def __init__(self, path=SEARCH_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        has_df = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'df'").fetchone()
+        self.conn.executescript(SCHEMA)
+        columns = [r[1] for r in self.conn.execute("PRAGMA table_info(postings)")]
+        if "title_tf" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE postings ADD COLUMN title_tf INTEGER NOT NULL DEFAULT 0")
+        # True until an import has tokenized every document for this INDEX_VERSION
+        self.needs_reindex = self.conn.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION
+        if not has_df:
+            # Index built before document frequencies were kept: count them once
+            with self.conn:
+                self.conn.execute("INSERT INTO df (token, n) SELECT token, COUNT(*) FROM postings GROUP BY token")
+
+    @classmethod
+    def open_existing(cls, path=SEARCH_DB):
+        return cls(path) if os.path.exists(path) else None
+
+    def close(self):
+        self.conn.close()
+
+    # --- import side ---
+
+    def write_batch(self, docs):
+        # docs: iterable of (filename, postings, length, title_length, signature), where
+        # the title is the first title_length tokens and signature is a MinHash
+        # signature (or None); one transaction per batch
+        with self.conn:
+            for filename, postings, length, title_length, signature in docs:
+                doc_id = self._doc_id(filename)
+                if doc_id is not None:
+                    self._release_df(doc_id)
+                    self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                    self.conn.execute("DELETE FROM minhash WHERE doc_id = ?", (doc_id,))
+                    self.conn.execute("DELETE FROM lsh WHERE doc_id = ?", (doc_id,))
+                    self.conn.execute("UPDATE docs SET length = ? WHERE id = ?", (length, doc_id))
+                else:
+                    doc_id = self.conn.execute(
+                        "INSERT INTO docs (filename, length) VALUES (?, ?)", (filename, length)).lastrowid
+                # Positions are ascending, so the title occurrences are the leading ones
+                self.conn.executemany(
+                    "INSERT INTO postings (token, doc_id, positions, title_tf) VALUES (?, ?, ?, ?)",
+                    ((token, doc_id, array("I", positions).tobytes(), bisect_left(positions, title_length))
+                     for token, positions in postings.items()))
+                self.conn.executemany(
+                    "INSERT INTO df (token, n) VALUES (?, 1) ON CONFLICT(token) DO UPDATE SET n = n + 1",
+                    ((token,) for token in postings))
+                if signature:
+                    self.conn.execute("INSERT INTO minhash (doc_id, signature) VALUES (?, ?)", (doc_id, signature))
+                    self.conn.executemany("INSERT INTO lsh (band, bucket, doc_id) VALUES (?, ?, ?)",
+                                          ((band, bucket, doc_id) for band, bucket in enumerate(bands(signature))))
+            self.conn.execute("DELETE FROM df WHERE n <= 0")
+
+    def _release_df(self, doc_id):
+        # Take a document's tokens out of the document frequencies before its postings go
+        self.conn.execute(
+            "UPDATE df SET n = n - 1 WHERE token IN (SELECT token FROM postings WHERE doc_id = ?)", (doc_id,))
+
+    def mark_reindexed(self):
+        self.conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self.needs_reindex = False
+
+    def retain(self, filenames):
+        # Drop documents that are no longer part of the index
+        filenames = set(filenames)
+        stale = [(doc_id,) for doc_id, filename in self.conn.execute("SELECT id, filename FROM docs")
+                 if filename not in filenames]
+        if stale:
+            with self.conn:
+                for (doc_id,) in stale:
+                    self._release_df(doc_id)
+                self.conn.execute("DELETE FROM df WHERE n <= 0")
+                self.conn.executemany("DELETE FROM postings WHERE doc_id = ?", stale)
+                self.conn.executemany("DELETE FROM auto_tags WHERE doc_id = ?", stale)
+                self.conn.executemany("DELETE FROM minhash WHERE doc_id = ?", stale)
+                self.conn.executemany("DELETE FROM lsh WHERE doc_id = ?", stale)
+                self.conn.executemany("DELETE FROM docs WHERE id = ?", stale)
+
+    def _doc_id(self, filename):
+        row = self.conn.execute("SELECT id FROM docs WHERE filename = ?", (filename,)).fetchone()
+        return row[0] if row else None
+
+    # --- tagging side ---
+
+    def doc_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def doc_frequencies(self, tokens):
+        # token -> number of documents containing it, for the given tokens
+        return dict(self._select_in("SELECT token, n FROM df WHERE token IN ({marks})", tokens))
+
+    def term_counts(self, filenames):
+        # filename -> {token: occurrences} for the given documents
+        counts = {}
+        for filename, token, size in self._select_in(
+                """SELECT d.filename, p.token, length(p.positions) FROM postings p
+                   JOIN docs d ON d.id = p.doc_id WHERE d.filename IN ({marks})""", filenames):
+            counts.setdefault(filename, {})[token] = size // POSITION_SIZE
+        return counts
+
+    def auto_tags(self, filenames):
+        # filename -> tags last added automatically to that document
+        return {filename: tag_str.split() for filename, tag_str in self._select_in(
+            """SELECT d.filename, a.tags FROM auto_tags a
+               JOIN docs d ON d.id = a.doc_id WHERE d.filename IN ({marks})""", filenames)}
+
+    def set_auto_tags(self, tags_by_filename):
+        with self.conn:
+            for filename, tags in tags_by_filename.items():
+                doc_id = self._doc_id(filename)
+                if doc_id is not None:
+                    self.conn.execute("INSERT OR REPLACE INTO auto_tags (doc_id, tags) VALUES (?, ?)",
+                                      (doc_id, " ".join(tags)))
+
+    # --- near-duplicate side ---
+
+    def related(self, filename, k=RELATED_K, min_similarity=RELATED_SIMILARITY):
+        """Up to k (filename, similarity) pairs most like filename, best first.
+
+        Only documents sharing an LSH bucket with it are compared, so the cost
+        follows the number of look-alikes rather than the size of the index.
+        """
+        doc_id = self._doc_id(filename)
+        row = self.conn.execute("SELECT signature FROM minhash WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is None:
+            return []
+        candidates = [d for (d,) in self.conn.execute(
+            """SELECT DISTINCT o.doc_id FROM lsh s
+               JOIN lsh o ON o.band = s.band AND o.bucket = s.bucket
+               WHERE s.doc_id = ? AND o.doc_id != ?""", (doc_id, doc_id))]
+        scored = [(d, similarity(row[0], sig)) for d, sig in self._signatures(candidates).items()]
+        top = heapq.nlargest(k, (pair for pair in scored if pair[1] >= min_similarity), key=itemgetter(1))
+        names = self._filename_map(d for d, _ in top)
+        return [(names[d], score) for d, score in top if d in names]
+
+    def near_duplicate_clusters(self, min_similarity=DUPLICATE_SIMILARITY, filenames=None):
+        """Groups of two or more filenames whose content is nearly the same, largest first.
+
+        Only documents sharing an LSH bucket are compared. Within a bucket each
+        document is checked against one member of each group found so far.
+        With filenames, only the buckets they fall in are read, so the result
+        is the clusters around those documents.
+        """
+        doc_ids = self._doc_ids(filenames) if filenames is not None else None
+        if doc_ids is not None and len(doc_ids) <= IN_CHUNK:
+            # A few documents (the usual re-import): look up just their buckets
+            marks = ",".join("?" * len(doc_ids))
+            rows = self.conn.execute(
+                f"""SELECT group_concat(l.doc_id)
+                    FROM (SELECT DISTINCT band, bucket FROM lsh WHERE doc_id IN ({marks})) q
+                    JOIN lsh l ON l.band = q.band AND l.bucket = q.bucket
+                    GROUP BY l.band, l.bucket HAVING COUNT(*) > 1""", list(doc_ids))
+        else:
+            rows = self.conn.execute(
+                "SELECT group_concat(doc_id) FROM lsh GROUP BY band, bucket HAVING COUNT(*) > 1")
+        groups = [[int(d) for d in members.split(",")] for (members,) in rows]
+        if doc_ids is not None:
+            groups = [members for members in groups if not doc_ids.isdisjoint(members)]
+        parent = {d: d for members in groups for d in members}  # Union-find over bucketed documents
+
+        def find(d):
+            while parent[d] != d:
+                parent[d] = parent[parent[d]]
+                d = parent[d]
+            return d
+
+        signatures = self._signatures(parent)
+        for members in groups:
+            leaders = []
+            for d in members:
+                root = find(d)
+                for leader in leaders:
+                    if find(leader) == root or similarity(signatures[leader], signatures[d]) >= min_similarity:
+                        parent[root] = find(leader)
+                        break
+                else:
+                    leaders.append(d)
+
+        clusters = {}
+        for d in parent:
+            clusters.setdefault(find(d), []).append(d)
+        clusters = [members for members in clusters.values() if len(members) > 1]
+        names = self._filename_map(d for members in clusters for d in members)
+        clusters = [sorted(names[d] for d in members if d in names) for members in clusters]
+        return sorted(clusters, key=lambda c: (-len(c), c))
+
+    def _signatures(self, doc_ids):
+        return dict(self._select_in("SELECT doc_id, signature FROM minhash WHERE doc_id IN ({marks})", doc_ids))
+
+    # --- query side ---
+
+    def _postings(self, token, prefix, with_positions):
+        # doc_id -> set of positions (or None) for one query token
+        cols = "doc_id, positions" if with_positions else "doc_id"
+        if prefix:
+            lo, hi = _prefix_bounds(token)
+            cur = self.conn.execute(f"SELECT {cols} FROM postings WHERE token >= ? AND token < ?", (lo, hi))
+        else:
+            cur = self.conn.execute(f"SELECT {cols} FROM postings WHERE token = ?", (token,))
+        hits = {}
+        for r in cur:
+            if with_positions:
+                positions = array("I")
+                positions.frombytes(r[1])
+                hits.setdefault(r[0], set()).update(positions)
+            else:
+                hits[r[0]] = None
+        return hits
+
+    def search(self, query):
+        """Filenames whose text contains the query's words as a phrase.
+
+        The last word is matched as a prefix so results track the query while
+        it is being typed. Returns None if the query has no indexable words.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        return self._filenames(self._phrase_docs(tokens, prefix_last=True))
+
+    def _phrase_docs(self, tokens, prefix_last=False):
+        # doc_ids containing tokens as consecutive words
+        phrase = len(tokens) > 1
+        per_token = [
+            self._postings(token, prefix_last and i == len(tokens) - 1, phrase)
+            for i, token in enumerate(tokens)
+        ]
+        candidates = set.intersection(*(set(p) for p in sorted(per_token, key=len)))
+        if phrase:
+            candidates = {doc_id for doc_id in candidates if self._has_phrase(per_token, doc_id)}
+        return candidates
+
+    @staticmethod
+    def _has_phrase(per_token, doc_id):
+        # Narrow the possible phrase starts token by token; set operations keep this out of Python loops
+        starts = per_token[0][doc_id]
+        for i in range(1, len(per_token)):
+            starts = starts.intersection(map((-i).__add__, per_token[i][doc_id]))
+            if not starts:
+                return False
+        return True
+
+    def rank(self, query, k=RANK_TOP_K, filenames=None):
+        """Top k (filename, score) pairs for query by BM25, best first.
+
+        Loose words are OR-ed; "quoted phrases" must occur as written. Title
+        occurrences count TITLE_BOOST times. filenames, if given, limits the
+        results to those documents. Returns None if the query has no words.
+        """
+        terms, phrases = parse_query(query)
+        all_terms = list(dict.fromkeys(terms + [t for phrase in phrases for t in phrase]))
+        if not all_terms:
+            return None
+        n_docs, total_length = self.conn.execute("SELECT COUNT(*), TOTAL(length) FROM docs").fetchone()
+        if not n_docs:
+            return []
+        avg_length = total_length / n_docs or 1.0
+        doc_freq = self.doc_frequencies(all_terms)
+
+        allowed = None
+        for phrase in phrases:
+            docs = self._phrase_docs(phrase)
+            allowed = docs if allowed is None else allowed & docs
+        if filenames is not None:
+            ids = self._doc_ids(filenames)
+            allowed = ids if allowed is None else allowed & ids
+        if allowed is not None and not allowed:
+            return []
+
+        scores = {}
+        for term in all_terms:
+            df = doc_freq.get(term, 0)
+            if not df:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            # Per-document term score, computed by SQLite rather than row by row in Python
+            cur = self.conn.execute(
+                """SELECT doc_id, :idf * tf * (:k1 + 1) / (tf + :k1 * (1 - :b + :b * length / :avg))
+                   FROM (SELECT p.doc_id AS doc_id, d.length AS length,
+                                length(p.positions) / :size + :extra * p.title_tf + 0.0 AS tf
+                         FROM postings p JOIN docs d ON d.id = p.doc_id WHERE p.token = :token)""",
+                {"idf": idf, "k1": BM25_K1, "b": BM25_B, "avg": avg_length, "size": POSITION_SIZE,
+                 "extra": TITLE_BOOST - 1, "token": term})
+            for doc_id, score in cur:
+                if allowed is None or doc_id in allowed:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+        top = heapq.nlargest(k, scores.items(), key=itemgetter(1))
+        names = self._filename_map(doc_id for doc_id, _ in top)
+        return [(names[doc_id], score) for doc_id, score in top if doc_id in names]
+
+    def _doc_ids(self, filenames):
+        return {d for (d,) in self._select_in("SELECT id FROM docs WHERE filename IN ({marks})", filenames)}
+
+    def _filename_map(self, doc_ids):
+        return dict(self._select_in("SELECT id, filename FROM docs WHERE id IN ({marks})", doc_ids))
+
+    def _filenames(self, doc_ids):
+        return {f for (f,) in self._select_in("SELECT filename FROM docs WHERE id IN ({marks})", doc_ids)}
+
+    def _select_in(self, sql, values):
+        # Rows of sql for all values, run IN_CHUNK at a time; sql has {marks} where the IN list goes
+        values = list(values)
+        for i in range(0, len(values), IN_CHUNK):
+            chunk = values[i:i + IN_CHUNK]
+            yield from self.conn.execute(sql.format(marks=",".join("?" * len(chunk))), chunk)
@@ -16,8 +16,94 @@ FREQUENCY_THRESHOLD = 2
 MAX_TAGS = 10
 
 
-def extract_tags(text: str) -> list:
-    words = re.findall(r'\b[a-zA-Z][a-zA-Z0-9_\-]{2,}\b', text.lower())
-    counts = Counter(word for word in words if word not in EXCLUDE)
+WORD_RE = re.compile(r'\b[a-zA-Z][a-zA-Z0-9_\-]{2,}\b')
+
+
+def count_words(parts, counts: Counter = None) -> Counter:
+    """Count candidate tag words across message parts, one part at a time.
+
+    parts is any iterable of message parts (e.g. extract_messages output);
+    non-text parts are skipped. Words are lowercased one by one rather than
+    copying the text, so memory grows with the vocabulary, not the text.
+    Counts are added to counts if given, and returned.
+    """
+    if counts is None:
+        counts = Counter()
+    for part in parts:
+        if isinstance(part, str):
+            counts.update(word for word in (m.group().lower() for m in WORD_RE.finditer(part))
+                          if word not in EXCLUDE)
+    return counts
+
+
+def merge_counts(partials) -> Counter:
+    # Combine count_words results, e.g. from parallel workers
+    total = Counter()
+    for counts in partials:
+        total.update(counts)
+    return total
+
+
+def tags_from_counts(counts: Counter) -> list:
     common = counts.most_common(MAX_TAGS)
-    return [tag for tag, _ in common if counts[tag] >= FREQUENCY_THRESHOLD]
+    return [tag for tag, count in common if count >= FREQUENCY_THRESHOLD]
+
+
+def extract_tags(text) -> list:
+    # text may be one string or an iterable of message parts
+    return tags_from_counts(count_words([text] if isinstance(text, str) else text))
+
+
+# Tags added automatically to each new or changed conversation at import
+AUTO_TAGS = 3
+# Words found in more than this share of conversations are too common to be tags...
+MAX_DF_RATIO = 0.5
+# ...once the library is big enough for the share to mean something
+MIN_DOCS_FOR_DF_RATIO = 20
+
+TAG_WORD_RE = re.compile(r'[a-z][a-z0-9_]{2,}')
+
+
+def is_tag_word(token: str) -> bool:
+    return TAG_WORD_RE.fullmatch(token) is not None and token not in EXCLUDE
+
+
+def rank_tags(term_counts: list, doc_freq: dict, n_docs: int, max_tags: int = AUTO_TAGS) -> list:
+    """Top TF-IDF tags for each document, scored against the whole library.
+
+    term_counts holds one {token: occurrences} dict per document; doc_freq maps
+    tokens to the number of documents (out of n_docs) containing them. Returns
+    one list of tags per document, best first. Needs numpy and scipy.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    # Sparse term-document matrix over the candidate words of these documents
+    vocab = {}
+    indptr, indices, data = [0], [], []
+    for counts in term_counts:
+        for token, count in counts.items():
+            if count >= FREQUENCY_THRESHOLD and is_tag_word(token):
+                indices.append(vocab.setdefault(token, len(vocab)))
+                data.append(count)
+        indptr.append(len(indices))
+    if not vocab:
+        return [[] for _ in term_counts]
+    tf = sparse.csr_matrix((np.asarray(data, dtype=np.float64), np.asarray(indices), np.asarray(indptr)),
+                           shape=(len(term_counts), len(vocab)))
+
+    df = np.fromiter((doc_freq.get(token, 1) for token in vocab), dtype=np.float64, count=len(vocab))
+    idf = np.log((1 + n_docs) / (1 + df)) + 1
+    if n_docs >= MIN_DOCS_FOR_DF_RATIO:
+        idf[df > MAX_DF_RATIO * n_docs] = 0
+    tf.data = 1 + np.log(tf.data)  # Sublinear tf: long conversations don't win on length alone
+    scores = (tf @ sparse.diags(idf)).tocsr()
+
+    words = np.array(list(vocab), dtype=object)
+    tags = []
+    for i in range(scores.shape[0]):
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        row = scores.data[start:end]
+        top = np.argsort(-row, kind='stable')[:max_tags]
+        tags.append([words[j] for j, score in zip(scores.indices[start:end][top], row[top]) if score > 0])
+    return tags
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import re
+
+TAG_JOURNAL = "feralcat_tags.jsonl"
+
+# Compact once the journal holds this many more records than a snapshot would
+COMPACT_SLACK = 1000
+
+TAG_RE = re.compile(r'#(\w+)')
+
+
+def title_with_tags(title, tags):
+    # Replace the #tags in a title with the given ones (without '#')
+    title_wo_tags = TAG_RE.sub('', title).strip()
+    title_wo_tags = " ".join(title_wo_tags.split())
+    if tags:
+        return f"{title_wo_tags} " + " ".join(f"#{t}" for t in tags)
+    return title_wo_tags
+
+
+class TagStore:
+    """Append-only journal of tag edits keyed by filename.
+
+    Every edit, single or bulk, is one appended JSON line of the form
+    {"set": {filename: [tags], ...}}. Replaying the journal gives the current tags. Files never mentioned fall
+    back to the tags in their index title. compact() rewrites the journal as a
+    single "set" snapshot.
+    """
+
+    def __init__(self, path=TAG_JOURNAL):
+        self.path = path
+        self.tags = {}  # filename -> list of tags
+        self._records = 0
+        self._read_bytes = 0  # Length and digest of the journal prefix replayed above
+        self._read_digest = hashlib.sha1()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # Torn (or still being written) final line; everything before it is intact
+                    self._read_bytes += len(raw)
+                    self._read_digest.update(raw)
+                    line = raw.decode("utf-8").strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._apply(record)
+                    self._records += 1
+
+    def _apply(self, record):
+        for filename, tags in record.get("set", {}).items():
+            self.tags[filename] = list(dict.fromkeys(tags))
+
+    def _append(self, record):
+        self._apply(record)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._records += 1
+        if self._records > len(self.tags) + COMPACT_SLACK:
+            self.compact()
+
+    def get(self, filename, default=None):
+        return self.tags.get(filename, default)
+
+    def set_tags(self, tags_by_filename):
+        # One journal write however many files are included
+        if tags_by_filename:
+            self._append({"set": {f: list(tags) for f, tags in tags_by_filename.items()}})
+
+    def compact(self):
+        # Rewrite the journal as one snapshot
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"set": self.tags}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._records = 1
+
+    def discard_read(self):
+        # Drop the records this TagStore was loaded from, keeping any appended since
+        # (e.g. by the viewer while an import ran). If the journal was rewritten in
+        # the meantime it is left alone: it still holds every edit.
+        if not self._read_bytes or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            if hashlib.sha1(f.read(self._read_bytes)).digest() != self._read_digest.digest():
+                return
+            rest = f.read()
+        if not rest:
+            os.remove(self.path)
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(rest)
+        os.replace(tmp_path, self.path)